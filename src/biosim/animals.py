@@ -15,15 +15,31 @@
 __author__ = "Sathuriyan Sivathas & Lavanyan Rathy"
 __email__ = "sathuriyan.sivathas@nmbu.no & lavanyan.rathy@nmbu.no"
 
-import math
-import random
+import numpy as np
+
+from biosim.parameters import ParameterDict, SpeciesParameters
+
+
+def global_rng():
+    """
+    A new random number generator seeded from the global NumPy random state.
+
+    Code that is not given a generator uses one of these, so seeding NumPy with
+    numpy.random.seed makes it reproducible.
+
+    Returns
+    -------
+    rng: numpy.random.Generator
+        The generator
+    """
+    return np.random.default_rng(np.random.randint(2 ** 63, dtype=np.int64))
 
 
 class Animal:
     """Superclass Animal in Biosim"""
-    __slots__ = ("age", "weight", "fitness", "death", "migrate", )
+    __slots__ = ("_age", "_weight", "_fitness", "_fitness_version", "death", )
 
-    parameters_animal = {
+    parameters_animal = ParameterDict({
         "w_birth": 8.0,
         "sigma_birth": 1.5,
         "beta": 0.9,
@@ -39,7 +55,7 @@ class Animal:
         "omega": 0.4,
         "F": 10.0,
         "DeltaPhiMax": None
-    }
+    })
 
     @classmethod
     def set_parameters_animals(cls, added_parameters: dict):
@@ -66,6 +82,41 @@ class Animal:
                 raise ValueError("Value must be positive integer")
             cls.parameters_animal[key] = value
 
+        cls.compile_parameters()
+
+    @classmethod
+    def compile_parameters(cls):
+        """
+        Make a new read-only snapshot of the parameters of the species.
+
+        Returns
+        -------
+        compiled: SpeciesParameters
+            The parameters as attributes, with the version of the parameter dictionary
+        """
+        compiled = SpeciesParameters(cls.parameters_animal,
+                                     previous=cls.__dict__.get("_compiled_parameters"))
+        cls._compiled_parameters = compiled
+        return compiled
+
+    @classmethod
+    def compiled_parameters(cls):
+        """
+        The read-only snapshot of the parameters of the species.
+
+        The stages bind the snapshot once, instead of looking up the parameter dictionary for
+        every animal. A new snapshot is made if the parameters have changed since the last one.
+
+        Returns
+        -------
+        compiled: SpeciesParameters
+            The parameters as attributes, with the version of the parameter dictionary
+        """
+        compiled = cls.__dict__.get("_compiled_parameters")
+        if compiled is None or compiled.version != cls.parameters_animal.version:
+            compiled = cls.compile_parameters()
+        return compiled
+
     def __init__(self, age=None, weight=None):
         """
         Constructor for Animal class.
@@ -77,6 +128,9 @@ class Animal:
         weight: float
             Weight of an animal, and the default value is set to be None.
         """
+        self._fitness = None
+        self._fitness_version = None
+
         if age is None:
             self.age = 0
         else:
@@ -87,12 +141,46 @@ class Animal:
         else:
             self.weight = weight
 
-        self.fitness = None
-        self.fitness_animal()
         self.death = False
-        self.migrate = False
 
-    def birth(self, n_animals_in_same_species: int):
+    @property
+    def age(self):
+        """Age of the animal. Changing it makes the cached fitness out of date."""
+        return self._age
+
+    @age.setter
+    def age(self, value):
+        self._age = value
+        self._fitness = None
+
+    @property
+    def weight(self):
+        """Weight of the animal. Changing it makes the cached fitness out of date."""
+        return self._weight
+
+    @weight.setter
+    def weight(self, value):
+        self._weight = value
+        self._fitness = None
+
+    @property
+    def fitness(self):
+        """
+        Fitness of the animal.
+
+        The fitness is only calculated when it is read, and kept until the age, the weight or
+        the parameters of the species change.
+        """
+        if self._fitness is None or self._fitness_version != self.parameters_animal.version:
+            self.fitness_animal()
+        return self._fitness
+
+    @fitness.setter
+    def fitness(self, value):
+        self._fitness = value
+        self._fitness_version = self.parameters_animal.version
+
+    def birth(self, n_animals_in_same_species: int, rng=None):
         r"""
         Probability to give birth for an animal.
 
@@ -116,6 +204,8 @@ class Animal:
         ----------
         n_animals_in_same_species : int
             The number of same species in one cell.
+        rng : numpy.random.Generator
+            Random number generator, a generator seeded from the global NumPy random state if None.
         Returns
         -------
         new_baby:
@@ -124,23 +214,22 @@ class Animal:
             If the requirements for birth is not filled
         """
 
-        probability = min(1, self.parameters_animal["gamma"] * self.fitness * (
-                n_animals_in_same_species - 1))
-        if self.weight < self.parameters_animal["zeta"] * (
-                self.parameters_animal["w_birth"] + self.parameters_animal["sigma_birth"]):
+        rng = global_rng() if rng is None else rng
+        parameters = self.compiled_parameters()
+        probability = min(1, parameters.gamma * self.fitness * (n_animals_in_same_species - 1))
+        if self.weight < parameters.birth_weight_limit:
             return None
-        elif random.random() < probability:
-            new_baby = type(self)()
-            if new_baby.weight * self.parameters_animal["xi"] < self.weight:
-                self.weight -= self.parameters_animal["xi"] * new_baby.weight
-                self.fitness_animal()
+        elif rng.random() < probability:
+            new_baby = type(self)(weight=self.weight_baby(rng))
+            if new_baby.weight * parameters.xi < self.weight:
+                self.weight -= parameters.xi * new_baby.weight
                 return new_baby
             else:
                 return None
         else:
             return None
 
-    def weight_baby(self):
+    def weight_baby(self, rng=None):
         r"""
         Gaussian distribution for determining the weight of a newborn baby.
         Used only for the purpose of testing. The formula is given by:
@@ -155,13 +244,19 @@ class Animal:
         NOTE! This model will not be an actual model of the Gaussian distribution, since we
         do not include negative numbers.
 
+        Parameters
+        ----------
+        rng : numpy.random.Generator
+            Random number generator, a generator seeded from the global NumPy random state if None.
+
         Returns
         -------
         weight: float
             Generates the new baby weight
         """
-        weight_baby = random.gauss(self.parameters_animal["w_birth"],
-                                   self.parameters_animal["sigma_birth"])
+        rng = global_rng() if rng is None else rng
+        parameters = self.compiled_parameters()
+        weight_baby = rng.normal(parameters.w_birth, parameters.sigma_birth)
         return weight_baby
 
     def weight_increase(self, food: float):
@@ -172,8 +267,148 @@ class Animal:
         ----------
         food: float
         """
-        self.weight += self.parameters_animal["beta"] * food
-        self.fitness_animal()
+        self.weight += self.compiled_parameters().beta * food
+
+    @classmethod
+    def fitness_batch(cls, age, weight):
+        r"""
+        Calculate the fitness of many animals of the species in one go.
+
+        This is the same formula as :meth:`fitness_animal`, evaluated on arrays with the
+        parameters of the species:
+
+        .. math::
+            \Phi =
+            \begin{cases}
+            0 & \text{for }w = 0\\
+            \frac{1}{1 + e^{\phi_{age}(a - a_{\frac{1}{2}})}} \times
+            \frac{1}{1 + e^{-\phi_{weight}(w - w_{\frac{1}{2}})}} & \text{else}
+            \end{cases}
+
+        Parameters
+        ----------
+        age: array_like
+            Ages of the animals.
+        weight: array_like
+            Weights of the animals.
+
+        Returns
+        -------
+        fitness: numpy.ndarray
+            The fitness of each animal
+        """
+        parameters = cls.compiled_parameters()
+        weight = np.asarray(weight, dtype=np.float64)
+
+        q_positive = cls.age_factor(age, parameters)
+        q_negative = cls.weight_factor(weight, parameters)
+
+        return np.where(weight == 0, 0.0, q_positive * q_negative)
+
+    @classmethod
+    def fitness_list(cls, ages, weights, parameters=None):
+        """
+        Calculate the fitness of a few animals with plain Python numbers.
+
+        This is the formula of :meth:`fitness_batch` with the same operations in the same
+        order, so the results are exactly the same. The exponentials of all the animals are taken
+        with one call of ``numpy.exp``, the rest is done with plain floats. For a few animals
+        this is much cheaper than the array operations.
+
+        Parameters
+        ----------
+        ages: list
+            Ages of the animals.
+        weights: list
+            Weights of the animals.
+        parameters: SpeciesParameters
+            Compiled parameters of the species, the current ones if None.
+
+        Returns
+        -------
+        fitness: list
+            The fitness of each animal, as floats
+        """
+        if parameters is None:
+            parameters = cls.compiled_parameters()
+        age_values = parameters.age_values
+        table_size = len(age_values)
+        phi_age = parameters.phi_age
+        a_half = parameters.a_half
+        phi_weight = -1 * parameters.phi_weight
+        w_half = parameters.w_half
+
+        exponents = [phi_weight * (weight - w_half) for weight in weights]
+        old = [index for index, age in enumerate(ages)
+               if not (isinstance(age, int) and 0 <= age < table_size)]
+        exponents += [phi_age * (ages[index] - a_half) for index in old]
+        with np.errstate(over="ignore"):
+            factors = (1 / (1 + np.exp(exponents))).tolist()
+
+        q_positive = [age_values[age] if isinstance(age, int) and 0 <= age < table_size
+                      else None for age in ages]
+        for position, index in enumerate(old, len(weights)):
+            q_positive[index] = factors[position]
+        return [0.0 if weight == 0 else q_age * q_weight
+                for weight, q_age, q_weight in zip(weights, q_positive, factors)]
+
+    @classmethod
+    def age_factor(cls, age, parameters=None):
+        r"""
+        The age factor of the fitness, :math:`\frac{1}{1 + e^{\phi_{age}(a - a_{\frac{1}{2}})}}`.
+
+        Integer ages are looked up in the table of the compiled parameters, see
+        :meth:`biosim.parameters.SpeciesParameters.build_age_table`. Other ages, and ages past
+        the end of the table, are calculated with the formula.
+
+        Parameters
+        ----------
+        age: array_like
+            Ages of the animals.
+        parameters: SpeciesParameters
+            Compiled parameters of the species, the current ones if None.
+
+        Returns
+        -------
+        q_positive: numpy.ndarray
+            The age factor for each age
+        """
+        if parameters is None:
+            parameters = cls.compiled_parameters()
+        age = np.asarray(age)
+        table = parameters.age_table
+        if age.dtype.kind in "iu" and (age.size == 0 or (age.min() >= 0
+                                                         and age.max() < table.shape[0])):
+            return table[age]
+
+        plus_exp = (parameters.phi_age) * (age.astype(np.float64) - parameters.a_half)
+        with np.errstate(over="ignore"):
+            return 1 / (1 + np.exp(plus_exp))
+
+    @classmethod
+    def weight_factor(cls, weight, parameters=None):
+        r"""
+        The weight factor of the fitness,
+        :math:`\frac{1}{1 + e^{-\phi_{weight}(w - w_{\frac{1}{2}})}}`.
+
+        Parameters
+        ----------
+        weight: array_like
+            Weights of the animals.
+        parameters: SpeciesParameters
+            Compiled parameters of the species, the current ones if None.
+
+        Returns
+        -------
+        q_negative: numpy.ndarray
+            The weight factor for each weight
+        """
+        if parameters is None:
+            parameters = cls.compiled_parameters()
+        neg_exp = (-1 * parameters.phi_weight) * (np.asarray(weight, dtype=np.float64)
+                                                  - parameters.w_half)
+        with np.errstate(over="ignore"):
+            return 1 / (1 + np.exp(neg_exp))
 
     def fitness_animal(self):
         r"""
@@ -186,51 +421,45 @@ class Animal:
             q^{+}(a, a_{\frac{1}{2}},\phi_{age}) \times
             q^{-}(w, w_{\frac{1}{2}},\phi_{weight}) & \text{else}
             \end{cases}
+
+        The calculation is done by :meth:`fitness_batch`, so a single animal gets exactly the same
+        fitness as when the whole population is calculated at once.
+
         Returns
         -------
         fitness: float
             The generated fitness of the animal
         """
+        self.fitness = float(self.fitness_batch(self.age, self.weight))
 
-        if self.weight == 0:
-            self.fitness = 0
-        else:
-
-            plus_exp = (self.parameters_animal["phi_age"]) * (
-                    self.age - self.parameters_animal["a_half"])
-            neg_exp = (-1 * self.parameters_animal["phi_weight"]) * (
-                    self.weight - self.parameters_animal["w_half"])
-
-            q_positive = 1 / (1 + math.exp(plus_exp))
-            q_negative = 1 / (1 + math.exp(neg_exp))
-
-            self.fitness = q_positive * q_negative
-
-    def migration_probability(self):
+    def migration_probability(self, rng=None):
         r"""
         This calculates the probability of an animal moving with :math:`\mu \Phi`
 
+        Parameters
+        ----------
+        rng : numpy.random.Generator
+            Random number generator, a generator seeded from the global NumPy random state if None.
+
         Returns
         -------
         Boolean
         """
-        migrate_probability = self.fitness * self.parameters_animal["mu"]
-        return random.random() < migrate_probability
+        rng = global_rng() if rng is None else rng
+        migrate_probability = self.fitness * self.compiled_parameters().mu
+        return rng.random() < migrate_probability
 
     def weight_decrease(self):
         r"""
         Decrease the weight of an animal, which will happen every year with :math:`\eta w`
         """
-        self.migrate = False
-
-        self.weight -= self.weight * self.parameters_animal["eta"]
-        self.fitness_animal()
+        self.weight -= self.weight * self.compiled_parameters().eta
 
     def aging(self):
         """Aging the animals every year with +1."""
-        self.age += 1.0
+        self.age += 1
 
-    def death_animal(self):
+    def death_animal(self, rng=None):
         r"""
         Death of an animal, using probability. If the animal is fitter then the other,
         the chance of survival increase a lot.
@@ -241,23 +470,29 @@ class Animal:
             \omega(1 - \Phi)
             \end{equation}
 
+        Parameters
+        ----------
+        rng : numpy.random.Generator
+            Random number generator, a generator seeded from the global NumPy random state if None.
+
         Returns
         -------
         Death: Boolean
             Returning if death is equal to true or false.
         """
-        probability_die = self.parameters_animal["omega"] * (1 - self.fitness)
+        rng = global_rng() if rng is None else rng
+        probability_die = self.compiled_parameters().omega * (1 - self.fitness)
 
         if self.weight == 0:
             self.death = True
-        elif probability_die > random.random():
+        elif probability_die > rng.random():
             self.death = True
         return self.death
 
 
 class Herbivore(Animal):
     """Subclass of the Animals class. This class is for the herbivore species in Biosim"""
-    parameters_animal = {
+    parameters_animal = ParameterDict({
         "w_birth": 8.0,
         "sigma_birth": 1.5,
         "beta": 0.9,
@@ -273,7 +508,7 @@ class Herbivore(Animal):
         "omega": 0.4,
         "F": 10.0,
         "DeltaPhiMax": None
-    }
+    })
 
     def __init__(self, age=None, weight=None):
         """
@@ -293,7 +528,7 @@ class Herbivore(Animal):
 
 class Carnivore(Animal):
     """Subclass of the Animals class. This class is for the carnivore species in Biosim"""
-    parameters_animal = {
+    parameters_animal = ParameterDict({
         "w_birth": 6.0,
         "sigma_birth": 1.0,
         "beta": 0.75,
@@ -309,7 +544,7 @@ class Carnivore(Animal):
         "omega": 0.8,
         "F": 50.0,
         "DeltaPhiMax": 10
-    }
+    })
 
     def __init__(self, age=None, weight=None):
         """
@@ -354,9 +589,10 @@ class Carnivore(Animal):
 
         """
 
+        delta_phi_max = self.compiled_parameters().DeltaPhiMax
         if self.fitness < herbivore.fitness:
             return 0
-        elif 0 < self.fitness - herbivore.fitness < self.parameters_animal["DeltaPhiMax"]:
-            return (self.fitness - herbivore.fitness) / self.parameters_animal["DeltaPhiMax"]
+        elif 0 < self.fitness - herbivore.fitness < delta_phi_max:
+            return (self.fitness - herbivore.fitness) / delta_phi_max
         else:
             return 1
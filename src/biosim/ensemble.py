@@ -0,0 +1,225 @@
+# -*- encoding: utf-8 -*-
+"""
+:mod: 'biosim.ensemble' runs replicates of one scenario with different seeds in parallel.
+
+The replicates run without graphics in a pool of worker processes. Every worker sets the
+parameters of the species and landscape types and parses the map once, and then runs one seed
+after the other on the same island, which is reset between the seeds.
+The cells of an island draw their random numbers from streams derived from the seed alone, so
+the counts of a seed do not depend on the worker it runs in or on the number of workers.
+
+.. note::
+    This file contains the following and can be imported as a module:
+
+    * simulate_counts - The yearly counts of one simulation, without graphics.
+    * island_counts - The yearly counts of one simulation on an island that is already made.
+    * scenario_parameters - All the parameters of a scenario, from the current ones and changes.
+    * run_tasks - The results of a function for many tasks, from a pool of worker processes.
+    * run_ensemble - The yearly counts of many seeds of the same scenario, in parallel.
+"""
+__author__ = "Sathuriyan Sivathas & Lavanyan Rathy"
+__email__ = "sathuriyan.sivathas@nmbu.no & lavanyan.rathy@nmbu.no"
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from biosim.island import Island
+from biosim.simulation import BioSim
+
+_scenario = None
+"""The island, initial population and number of years of the replicates run by this process"""
+
+
+def simulate_counts(island_map, ini_pop, seed, num_years):
+    """
+    Simulate an island without graphics and count the animals every year.
+
+    Parameters
+    ----------
+    island_map: str
+        Multi-line string with the geography of the island.
+    ini_pop: list
+        The initial population.
+    seed: int
+        The seed of the simulation.
+    num_years: int
+        The number of years to simulate.
+
+    Returns
+    -------
+    counts: numpy.ndarray
+        Array of shape (num_years + 1, 2) with the number of herbivores and carnivores at the
+        start and after every year
+    """
+    return island_counts(Island(island_map, seed=seed), ini_pop, num_years)
+
+
+def island_counts(island, ini_pop, num_years):
+    """
+    Place the initial population on an island, simulate it and count the animals every year.
+
+    This is what :class:`biosim.simulation.BioSim` does without graphics and log, on an island
+    that is already made.
+
+    Parameters
+    ----------
+    island: Island
+        An island without animals, with the seed of the simulation, see
+        :meth:`biosim.island.Island.reset`.
+    ini_pop: list
+        The initial population.
+    num_years: int
+        The number of years to simulate.
+
+    Returns
+    -------
+    counts: numpy.ndarray
+        Array of shape (num_years + 1, 2) with the number of herbivores and carnivores at the
+        start and after every year
+    """
+    island.population_cell(ini_pop)
+    counts = np.zeros((num_years + 1, len(BioSim.animal_species)), dtype=np.int64)
+    for year in range(num_years + 1):
+        if year:
+            island.annual_cycle()
+        counts[year] = island.herbivore_counter.total, island.carnivore_counter.total
+    return counts
+
+
+def scenario_parameters(species_parameters=None, landscape_parameters=None):
+    """
+    The current parameters of all species and landscape types, with some of them changed.
+
+    The changes are checked by the setters of :class:`biosim.simulation.BioSim`, but the
+    parameters of this process are left as they were.
+
+    Parameters
+    ----------
+    species_parameters: dict
+        New parameters of the species, by species name, e.g. {"Carnivore": {"F": 40}}.
+    landscape_parameters: dict
+        New parameters of the landscape types, by code letter, e.g. {"L": {"f_max": 700}}.
+
+    Returns
+    -------
+    parameters: dict
+        All the parameters, see :meth:`biosim.simulation.BioSim.parameter_state`
+    """
+    current = BioSim.parameter_state()
+    try:
+        for species, params in (species_parameters or {}).items():
+            BioSim.set_animal_parameters(species, params)
+        for landscape, params in (landscape_parameters or {}).items():
+            BioSim.set_landscape_parameters(landscape, params)
+        return BioSim.parameter_state()
+    finally:
+        BioSim.restore_parameters(current)
+
+
+def _start_worker(island_map, ini_pop, num_years, parameters):
+    """Set the parameters and parse the map in the worker, before it runs any seed."""
+    global _scenario
+    BioSim.restore_parameters(parameters)
+    _scenario = (Island(island_map), ini_pop, num_years)
+
+
+def _run_seed(seed):
+    """The yearly counts of one seed of the scenario of the worker."""
+    island, ini_pop, num_years = _scenario
+    island.reset(seed)
+    return island_counts(island, ini_pop, num_years)
+
+
+def run_tasks(function, tasks, processes=None, initializer=None, initargs=()):
+    """
+    The results of a function for every task, in order, from a pool of worker processes.
+
+    Every worker runs the initializer before its first task, and gets the tasks in chunks of
+    about a quarter of its share. With one process the tasks run in this process, after the
+    initializer, and the parameters of the species and landscape types of this process are set
+    back when they are done.
+
+    Parameters
+    ----------
+    function: callable
+        Function of one task, defined at the top of a module so the workers can find it.
+    tasks: list
+        The tasks.
+    processes: int
+        The number of worker processes, the number of CPUs if None.
+    initializer: callable
+        Function run in every worker before its first task.
+    initargs: tuple
+        The arguments of the initializer.
+
+    Yields
+    ------
+    result: object
+        The result of every task, as soon as it and the ones before it are done
+    """
+    tasks = list(tasks)
+    if not tasks:
+        return
+    if processes == 1:
+        current = BioSim.parameter_state()
+        try:
+            if initializer is not None:
+                initializer(*initargs)
+            for task in tasks:
+                yield function(task)
+        finally:
+            BioSim.restore_parameters(current)
+        return
+
+    processes = processes or os.cpu_count() or 1
+    chunksize = max(1, len(tasks) // (4 * processes))
+    with ProcessPoolExecutor(max_workers=processes, initializer=initializer,
+                             initargs=initargs) as executor:
+        yield from executor.map(function, tasks, chunksize=chunksize)
+
+
+def run_ensemble(island_map, ini_pop, seeds, num_years, species_parameters=None,
+                 landscape_parameters=None, processes=None):
+    """
+    Simulate the same scenario once for every seed, in a pool of worker processes.
+
+    The parameters are the parameters of this process when the ensemble starts, with the given
+    changes. The parameters of this process are not changed.
+
+    Parameters
+    ----------
+    island_map: str
+        Multi-line string with the geography of the island.
+    ini_pop: list
+        The initial population.
+    seeds: list
+        The seeds of the replicates.
+    num_years: int
+        The number of years to simulate.
+    species_parameters: dict
+        New parameters of the species, by species name.
+    landscape_parameters: dict
+        New parameters of the landscape types, by code letter.
+    processes: int
+        The number of worker processes, the number of CPUs if None. With one process the
+        replicates run in this process.
+
+    Returns
+    -------
+    counts: numpy.ndarray
+        Array of shape (len(seeds), num_years + 1, 2) with the number of herbivores and
+        carnivores of every replicate at the start and after every year
+    """
+    global _scenario
+    parameters = scenario_parameters(species_parameters, landscape_parameters)
+    seeds = list(seeds)
+    if not seeds:
+        return np.zeros((0, num_years + 1, len(BioSim.animal_species)), dtype=np.int64)
+
+    try:
+        return np.stack(list(run_tasks(_run_seed, seeds, processes, _start_worker,
+                                       (island_map, ini_pop, num_years, parameters))))
+    finally:
+        _scenario = None
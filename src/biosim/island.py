@@ -7,6 +7,10 @@ This script will give the user the annual cycle of Rossumøya, and also give us
      This file contains the following and can be imported as a module:
 
     * Island - Class that makes the Rossumøya island, and a method to get alle the animals.
+
+    The island keeps its topology as arrays: a grid of terrain codes, a flat index of the land
+    cells, and the land neighbors of every land cell in compressed sparse row form, see
+    :meth:`Island.build_topology`. A land cell only gets a cell object when it is first needed.
     Notes
     -----
         To run this script, the user needs to have 'numpy' installed in the Python environment
@@ -19,23 +23,43 @@ import textwrap
 
 import numpy as np
 
-from biosim.landscape import Lowland, Water, Highland, Desert
+from biosim.landscape import Landscape, Lowland, Water, Highland, Desert
+from biosim.population import Population, PopulationCounter, PopulationSnapshot
 
 
 class Island:
     """Class for Island in Biosim """
 
-    __slots__ = ("ini_herbs", "ini_carns", "geogr", "lines", "map")
+    __slots__ = ("ini_herbs", "ini_carns", "geogr", "lines", "map", "seed_sequence", "year",
+                 "placements", "active_cells", "terrain", "cell_index", "locations", "cells",
+                 "tiles", "tile_rngs", "cell_rng", "fodder", "neighbor_offsets",
+                 "neighbor_indices", "neighbor_counts", "herbivore_counter", "carnivore_counter")
     landscape_types = {"L": Lowland, "W": Water, "H": Highland, "D": Desert}
-
-    def __init__(self, map_of_island=None):
+    terrain_codes = "WLHD"
+    """The letters of the landscape types, the terrain code of a type is its position here"""
+    invalid_code = 255
+    """Terrain code of a letter that is not a landscape type"""
+    checkpoint_species = ("herbivore_population", "carnivore_population")
+    """The populations of a cell saved in a checkpoint"""
+    tile_size = 16
+    """Side of the square tiles of cells that share a random number stream"""
+
+    def __init__(self, map_of_island=None, seed=None):
         """
         Constructor for the Island class
 
+        The island is split in square tiles of :attr:`tile_size` cells, and the cells of a tile
+        draw their random numbers from a stream of the tile, spawned from the seed and keyed by
+        the tile and the year. The cells of a tile are always run in the order of their flat
+        index, so the outcome of a year does not depend on the order the cells or the tiles are
+        run in, and tiles can be run in parallel.
+
         Parameters
         ----------
         map_of_island: str
                 Multiline string to create a map
+        seed: int or numpy.random.SeedSequence
+                Seed for the random number streams of the cells, fresh entropy is used if None.
         """
 
         self.ini_herbs = []
@@ -49,90 +73,460 @@ class Island:
 
         self.geogr = textwrap.dedent(map_of_island)
         self.lines = self.geogr.splitlines()
-        self.map = {}
         self.create_map()
+        self.reset(seed)
 
     def create_map(self):
-        """Here we create the actual map of the island."""
+        """
+        Here we create the actual map of the island.
+
+        The map string is turned into the terrain grid in bulk, and checked with array
+        operations. No cell objects are made here: a land cell gets one when animals are placed
+        in it, or when it becomes the neighbor of an active cell, see :meth:`cell`. Until then
+        its fodder is kept in :attr:`fodder`, and water is only a code in the terrain grid.
+
+        :raises ValueError: The lines have different lengths, the map is not surrounded by
+            water or a letter is not a landscape type
+        """
 
         self.map_lines()
+        self.terrain = self.parse_terrain(self.lines)
         self.map_boundaries()
-        for i, rows in enumerate(self.lines):
-            for j, column in enumerate(rows):
-                if column == "W":
-                    self.map[(i + 1, j + 1)] = Water()
-                elif column == "L":
-                    self.map[(i + 1, j + 1)] = Lowland()
-                elif column == "H":
-                    self.map[(i + 1, j + 1)] = Highland()
-                elif column == "D":
-                    self.map[(i + 1, j + 1)] = Desert()
-                else:
-                    raise ValueError("This is not a valid landscape type. Try again!")
-
-        for loc, cell in self.map.items():
-            if not cell.migration_possible:
-                continue
-            neighbor_loc = (loc[0], loc[1] - 1), \
-                           (loc[0], loc[1] + 1), \
-                           (loc[0] - 1, loc[1]), \
-                           (loc[0] + 1, loc[1])
-
-            for n_loc in neighbor_loc:
-                neighbor_cell = self.map.get(n_loc)
-                if neighbor_cell is not None:
-                    cell.neighbors.append(neighbor_cell)
+        if (self.terrain == self.invalid_code).any():
+            raise ValueError("This is not a valid landscape type. Try again!")
+        self.build_topology()
 
-    def map_boundaries(self):
-        """Here we define the boundaries of the map.
+    def reset(self, seed=None):
+        """
+        Make the island new again, without animals, at year 0 and with a new seed.
 
-        .. code-block:: python
-        if elements != "W":
+        The map is not parsed again, only the cell objects, the count matrices and the fodder
+        are thrown away. An island can thus be used for many simulations of the same map.
+
+        Parameters
+        ----------
+        seed: int or numpy.random.SeedSequence
+            Seed for the random number streams of the cells, fresh entropy is used if None.
+        """
+        if isinstance(seed, np.random.SeedSequence):
+            self.seed_sequence = seed
+        else:
+            self.seed_sequence = np.random.SeedSequence(seed)
+        self.year = 0
+        self.placements = 0
+        self.active_cells = {}
+        self.tile_rngs = {}
+        self.cell_rng = np.random.default_rng(self.seed_sequence)
+        self.map = {}
+        self.cells = [None] * self.locations.shape[0]
+        self.herbivore_counter = PopulationCounter(self.terrain.shape)
+        self.carnivore_counter = PopulationCounter(self.terrain.shape)
 
-        raise ValueError("The inputted map is not surrounded by water. Try again!")
+        f_max = np.array([self.landscape_types[letter].compiled_parameters().f_max
+                          for letter in self.terrain_codes], dtype=np.float64)
+        rows, columns = (self.locations - 1).T
+        self.fodder = f_max[self.terrain[rows, columns]]
 
-        :raises ValueError: The boarders are not water
+    def cell(self, index):
+        """
+        The cell object of a land cell, made the first time it is asked for.
+
+        A new cell gets the fodder of the land cell from :attr:`fodder`, and its populations are
+        bound to the count matrices of the island. Its neighbors are set when it becomes active,
+        see :meth:`connect`.
+
+        Parameters
+        ----------
+        index: int
+            The flat index of the land cell.
+
+        Returns
+        -------
+        cell: Landscape
+            The cell object
+        """
+        cell = self.cells[index]
+        if cell is None:
+            row, column = self.locations[index].tolist()
+            letter = self.terrain_codes[self.terrain[row - 1, column - 1]]
+            cell = self.landscape_types[letter](rng=self.cell_rng)
+            cell.fodder = float(self.fodder[index])
+            grid_index = (row - 1) * self.terrain.shape[1] + column - 1
+            cell.herbivore_population.bind_counter(self.herbivore_counter, grid_index)
+            cell.carnivore_population.bind_counter(self.carnivore_counter, grid_index)
+            cell.neighbor_count = int(self.neighbor_counts[index])
+            self.cells[index] = cell
+            self.map[(row, column)] = cell
+        return cell
+
+    def connect(self, index):
+        """
+        Give a land cell the cell objects of its land neighbors, so its animals can migrate.
+
+        Parameters
+        ----------
+        index: int
+            The flat index of the land cell.
+
+        Returns
+        -------
+        cell: Landscape
+            The cell object
         """
+        cell = self.cell(index)
+        start, stop = self.neighbor_offsets[index:index + 2].tolist()
+        if len(cell.neighbors) != stop - start:
+            cell.neighbors = [self.cell(neighbor)
+                              for neighbor in self.neighbor_indices[start:stop].tolist()]
+        return cell
+
+    @classmethod
+    def parse_terrain(cls, lines):
+        """
+        Turn the lines of the map into a grid of terrain codes in one go.
 
-        for row in self.lines[0] + self.lines[-1]:
-            for elements in row:
-                if elements != "W":
-                    raise ValueError("The inputted map is not surrounded by water. Try again!")
+        Parameters
+        ----------
+        lines: list
+            The lines of the map, all of the same length.
 
-        for row in self.lines:
-            for i in range(len(row[0])):
-                if row[0][i] != "W" and row[-1][i] != "W":
-                    raise ValueError("The inputted map is not surrounded by water. Try again!")
+        Returns
+        -------
+        terrain: numpy.ndarray
+            The terrain code of every cell, :attr:`invalid_code` for letters that are not a
+            landscape type
+        """
+        characters = np.frombuffer("".join(lines).encode("utf-32-le"), dtype="<u4")
+        terrain = np.full(characters.shape, cls.invalid_code, dtype=np.uint8)
+        for code, letter in enumerate(cls.terrain_codes):
+            terrain[characters == ord(letter)] = code
+        return terrain.reshape(len(lines), -1 if lines else 0)
+
+    def build_topology(self):
+        """
+        Build the arrays describing the land cells and their neighbors from the terrain grid.
+
+        * cell_index - Grid with the flat index of every land cell, and -1 for water.
+        * locations - The location (row, column) of every land cell, by flat index.
+        * neighbor_offsets, neighbor_indices - The land neighbors of land cell i are
+          ``neighbor_indices[neighbor_offsets[i]:neighbor_offsets[i + 1]]``, in the order west,
+          east, north, south.
+        * neighbor_counts - The number of neighbors of every land cell, water included.
+        * tiles - The tile of every land cell, by flat index. The tiles are numbered row by row.
+
+        A land cell with a cell object knows the count of all its neighbors, so a migrant that
+        picks water is rejected by its index alone.
+        """
+        land = self.terrain != self.terrain_codes.index("W")
+        rows, columns = np.nonzero(land)
+        self.cell_index = np.full(self.terrain.shape, -1, dtype=np.intp)
+        self.cell_index[rows, columns] = np.arange(rows.shape[0])
+        self.locations = np.column_stack((rows + 1, columns + 1))
+        tiles_per_row = -(-self.terrain.shape[1] // self.tile_size)
+        self.tiles = rows // self.tile_size * tiles_per_row + columns // self.tile_size
+
+        padded_index = np.pad(self.cell_index, 1, constant_values=-1)
+        padded_map = np.pad(np.ones(self.terrain.shape, dtype=bool), 1, constant_values=False)
+        shifts = ((slice(1, -1), slice(None, -2)),
+                  (slice(1, -1), slice(2, None)),
+                  (slice(None, -2), slice(1, -1)),
+                  (slice(2, None), slice(1, -1)))
+        neighbors = np.stack([padded_index[shift] for shift in shifts], axis=-1)[land]
+        on_map = np.stack([padded_map[shift] for shift in shifts], axis=-1)[land]
+
+        land_neighbors = neighbors >= 0
+        self.neighbor_counts = np.count_nonzero(on_map, axis=1)
+        self.neighbor_offsets = np.zeros(rows.shape[0] + 1, dtype=np.intp)
+        np.cumsum(np.count_nonzero(land_neighbors, axis=1), out=self.neighbor_offsets[1:])
+        self.neighbor_indices = neighbors[land_neighbors]
+
+    def map_boundaries(self):
+        """Here we define the boundaries of the map.
+
+        The first and last row and the first and last column of the terrain grid must all be
+        water.
+
+        :raises ValueError: The boarders are not water
+        """
+        water = self.terrain_codes.index("W")
+        edges = (self.terrain[0], self.terrain[-1], self.terrain[:, 0], self.terrain[:, -1])
+        if any((edge != water).any() for edge in edges):
+            raise ValueError("The inputted map is not surrounded by water. Try again!")
 
     def map_lines(self):
         """Check if the map lines are the equal length."""
-        for line in self.lines:
-            if len(self.lines[0]) != len(line):
-                raise ValueError("All the lines on the map should have equal lengths!")
-            else:
-                pass
+        lengths = np.fromiter(map(len, self.lines), dtype=np.intp, count=len(self.lines))
+        if (lengths != lengths[:1]).any():
+            raise ValueError("All the lines on the map should have equal lengths!")
 
     def population_cell(self, population):
         """
         Check how many animals there are in a cell, for both herbivores and carnivores.
 
+        The weights that are drawn for animals without a weight come from a stream of the tile
+        of the cell, keyed by the year and by how many times animals have been placed.
+
         Parameters
         ----------
         population: list
                     List of dicts that contains the newly populated animals
 
         """
+        self.placements += 1
+        tile_rngs = {}
         for item in population:
             population = item["pop"]
             loc = item["loc"]
 
-            self.map[loc].population_update(population)
+            index = self.land_index(loc)
+            if index < 0:
+                raise ValueError(f"Animals can only be placed on land, {loc} is not land!")
+            cell = self.cell(index)
+            tile = int(self.tiles[index])
+            if tile not in tile_rngs:
+                tile_rngs[tile] = self.tile_rng(tile, placement=self.placements)
+            cell.rng = tile_rngs[tile]
+            cell.population_update(population)
+            self.activate_cell(index)
+
+    def land_index(self, loc):
+        """
+        The flat index of the land cell at a location.
+
+        Parameters
+        ----------
+        loc: tuple
+            The (row, column) location, counted from 1.
+
+        Returns
+        -------
+        index: int
+            The flat index of the land cell, -1 if the location is water or not on the map
+        """
+        row, column = loc
+        rows, columns = self.cell_index.shape
+        if not (1 <= row <= rows and 1 <= column <= columns):
+            return -1
+        return int(self.cell_index[row - 1, column - 1])
+
+    def activate_cell(self, index):
+        """
+        Add a land cell with animals to the active cells, the only cells the annual cycle
+        visits.
+
+        A cell that has been empty has not been visited, so its fodder is grown back here, when
+        it gets animals again. The cell gets its neighbors here, see :meth:`connect`.
+
+        Parameters
+        ----------
+        index: int
+            The flat index of the land cell.
+        """
+        cell = self.cells[index]
+        if index in self.active_cells or cell is None:
+            return
+        if len(cell.herbivore_population) or len(cell.carnivore_population):
+            self.connect(index)
+            cell.new_fodder()
+            self.active_cells[index] = cell
+
+    def tile_rng(self, tile, year=None, placement=0):
+        """
+        Random number generator of a tile for one year.
+
+        The stream is a child of the seed of the island, with the year, the tile and the
+        placement as its spawn key, so the same tile in the same year always gets the same
+        numbers.
+
+        Parameters
+        ----------
+        tile: int
+            The tile, see :attr:`tiles`.
+        year: int
+            The year of the stream, the current year of the island if None. Year :math:`n` is
+            used by the annual cycle of the n-th year, and by animals placed after it.
+        placement: int
+            0 for the annual cycle, the number of the placement for animals placed on the
+            island, see :meth:`population_cell`.
+
+        Returns
+        -------
+        rng: numpy.random.Generator
+            Generator for the stream of the tile
+        """
+        if year is None:
+            year = self.year
+        seed_sequence = np.random.SeedSequence(
+            self.seed_sequence.entropy,
+            spawn_key=self.seed_sequence.spawn_key + (year, tile, placement),
+            pool_size=self.seed_sequence.pool_size)
+        return np.random.default_rng(seed_sequence)
+
+    def cycle_rng(self, index):
+        """
+        Random number generator of a cell for the annual cycle of the current year, the
+        generator of its tile.
+
+        Parameters
+        ----------
+        index: int
+            The flat index of the land cell.
+
+        Returns
+        -------
+        rng: numpy.random.Generator
+            The generator the cells of the tile share this year
+        """
+        tile = int(self.tiles[index])
+        rng = self.tile_rngs.get(tile)
+        if rng is None:
+            rng = self.tile_rngs[tile] = self.tile_rng(tile)
+        return rng
 
     def annual_cycle(self):
-        """This method will run the annual cycle method, which is used in landscape."""
+        """
+        This method will run the annual cycle of the landscape stage by stage: a stage is run in
+        every active cell before the next stage starts, see
+        :attr:`biosim.landscape.Landscape.annual_stages`. The migrants wait in the arrival
+        buffers of their new cells until every cell has had its migration.
+
+        Only the active cells, the land cells with animals, are visited. A cell becomes active
+        when animals are placed in it or migrate to it, and stops being active when all its
+        animals have died or left. The active cells are run in the order of their flat index,
+        and every tile gets its random number stream for the new year before the cycle starts.
+        """
+        self.year += 1
+        self.tile_rngs = {}
+        self.active_cells = {index: self.active_cells[index]
+                             for index in sorted(self.active_cells)}
+        for index, cell in self.active_cells.items():
+            cell.rng = self.cycle_rng(index)
+
+        for stage in Landscape.annual_stages:
+            for cell in self.active_cells.values():
+                for method in stage:
+                    getattr(cell, method)()
+            if "migrated_animals" in stage:
+                self.activate_arrival_cells()
+
+        for index in [index for index, cell in self.active_cells.items()
+                      if not len(cell.herbivore_population)
+                      and not len(cell.carnivore_population)]:
+            del self.active_cells[index]
+
+    def activate_arrival_cells(self):
+        """
+        Make the empty cells that animals have migrated to active, so the arrivals are merged
+        and go through the rest of the year.
+
+        The land neighbors of all the active cells are gathered from the neighbor arrays in one
+        go, and only the ones that are not active yet are looked at. The active cells are kept in
+        the order of their flat index, also for the stages after the migration.
+        """
+        active = np.fromiter(self.active_cells, dtype=np.intp, count=len(self.active_cells))
+        starts = self.neighbor_offsets[active]
+        counts = self.neighbor_offsets[active + 1] - starts
+        positions = np.arange(counts.sum()) + np.repeat(starts - np.cumsum(counts) + counts,
+                                                        counts)
+        arrival_indices = np.setdiff1d(self.neighbor_indices[positions], active)
+
+        activated = False
+        for index in arrival_indices.tolist():
+            cell = self.cells[index]
+            if any(len(buffer) for buffer in cell.arrivals.values()):
+                self.connect(index)
+                cell.rng = self.cycle_rng(index)
+                cell.new_fodder()
+                self.active_cells[index] = cell
+                activated = True
+        if activated:
+            self.active_cells = {index: self.active_cells[index]
+                                 for index in sorted(self.active_cells)}
+
+    def checkpoint(self):
+        """
+        The state of the island between two years, as a few arrays.
+
+        The random number streams need no state of their own, they follow from the seed, the
+        year and the number of placements. Only the active cells have animals, their
+        populations are gathered in the order of the active cells.
+
+        Returns
+        -------
+        state: dict
+            The year, the number of placements and the seed sequence of the island, as plain
+            Python numbers that json can write
+        arrays: dict
+            The flat indices of the active cells, the fodder of every land cell, and for each
+            species the number of animals of every active cell and the columns of the animals
+        """
+        state = {"year": self.year,
+                 "placements": self.placements,
+                 "entropy": np.asarray(self.seed_sequence.entropy).tolist(),
+                 "spawn_key": [int(key) for key in self.seed_sequence.spawn_key],
+                 "pool_size": int(self.seed_sequence.pool_size)}
+        fodder = self.fodder.copy()
+        for index, cell in enumerate(self.cells):
+            if cell is not None:
+                fodder[index] = cell.fodder
+        arrays = {"active": np.fromiter(self.active_cells, dtype=np.intp,
+                                        count=len(self.active_cells)),
+                  "fodder": fodder}
+        for species_population in self.checkpoint_species:
+            populations = [getattr(cell, species_population)
+                           for cell in self.active_cells.values()]
+            arrays[f"{species_population}_sizes"] = np.fromiter(
+                map(len, populations), dtype=np.int64, count=len(populations))
+            for column, array in Population.gather(populations).items():
+                arrays[f"{species_population}_{column}"] = array
+        return state, arrays
+
+    def restore(self, state, arrays):
+        """
+        Put the island in the state of a checkpoint of the same map, see :meth:`checkpoint`.
+        The animals it has are thrown away, see :meth:`reset`.
 
-        for cell in self.map.values():
-            cell.annual_cycle()
+        Parameters
+        ----------
+        state: dict
+            The year, number of placements and seed sequence of the island.
+        arrays: dict
+            The arrays of the checkpoint.
+        """
+        self.reset(np.random.SeedSequence(state["entropy"], spawn_key=tuple(state["spawn_key"]),
+                                          pool_size=state["pool_size"]))
+        self.year = state["year"]
+        self.placements = state["placements"]
+
+        self.fodder = arrays["fodder"].astype(np.float64)
+        active = arrays["active"].tolist()
+        for index in active:
+            self.connect(index)
+        for species_population in self.checkpoint_species:
+            columns = {column: arrays[f"{species_population}_{column}"]
+                       for column in Population.gather([])}
+            offsets = np.zeros(len(active) + 1, dtype=np.int64)
+            np.cumsum(arrays[f"{species_population}_sizes"], out=offsets[1:])
+            for index, start, stop in zip(active, offsets[:-1].tolist(), offsets[1:].tolist()):
+                getattr(self.cells[index], species_population).restore(columns, start, stop)
+        self.active_cells = {index: self.cells[index] for index in active}
+
+    def location(self, index):
+        """
+        The location of a land cell.
+
+        Parameters
+        ----------
+        index: int
+            The flat index of the land cell.
+
+        Returns
+        -------
+        loc: tuple
+            The (row, column) location of the cell
+        """
+        row, column = self.locations[index].tolist()
+        return row, column
 
     def get_all_herbivores(self):
         """
@@ -145,9 +539,7 @@ class Island:
         """
         all_herbivore_list = []
 
-        for loc, cell in self.map.items():
-            if not cell.migration_possible:
-                continue
+        for cell in self.active_cells.values():
             all_herbivore_list.extend(cell.herbivores)
         return all_herbivore_list
 
@@ -162,38 +554,70 @@ class Island:
         """
         all_carnivore_list = []
 
-        for loc, cell in self.map.items():
-            if not cell.migration_possible:
-                continue
+        for cell in self.active_cells.values():
             all_carnivore_list.extend(cell.carnivores)
         return all_carnivore_list
 
+    def population_snapshot(self, species_population):
+        """
+        The age, weight, fitness and cell of every animal of one species on the island, as
+        read-only arrays.
+
+        Only the active cells hold animals, so only their arrays are collected. If all the
+        animals are in one cell, the arrays are views of its population and nothing is copied.
+
+        Parameters
+        ----------
+        species_population: str
+            "herbivore_population" or "carnivore_population".
+
+        Returns
+        -------
+        snapshot: PopulationSnapshot
+            Arrays age, weight, fitness and cell, where cell is the flat index of the land cell
+        """
+        return PopulationSnapshot([getattr(cell, species_population)
+                                   for cell in self.active_cells.values()],
+                                  list(self.active_cells))
+
+    def herbivore_snapshot(self):
+        """
+        Snapshot of all the herbivores, see :meth:`population_snapshot`.
+
+        Returns
+        -------
+        snapshot: PopulationSnapshot
+            Arrays age, weight, fitness and cell of the herbivores
+        """
+        return self.population_snapshot("herbivore_population")
+
+    def carnivore_snapshot(self):
+        """
+        Snapshot of all the carnivores, see :meth:`population_snapshot`.
+
+        Returns
+        -------
+        snapshot: PopulationSnapshot
+            Arrays age, weight, fitness and cell of the carnivores
+        """
+        return self.population_snapshot("carnivore_population")
+
     def matrix_herbivores(self):
         """
         Matrix for herbivores.
 
+        The counts are kept up to date by the populations, this is a read-only view of them.
+
         :return: Matrix of the herbivore movement.
         """
-        dim = list(self.map.items())[-1][0]
-        matrix_herb = np.zeros(dim)
-
-        for loc, cell in self.map.items():
-            if not cell.migration_possible:
-                continue
-            matrix_herb[loc[0] - 1][loc[1] - 1] = len(cell.herbivores)
-        return matrix_herb
+        return self.herbivore_counter.cells
 
     def matrix_carnivores(self):
         """
         Matrix for carnivores.
 
+        The counts are kept up to date by the populations, this is a read-only view of them.
+
         :return: Matrix of the carnivore movement.
         """
-        dim = list(self.map.items())[-1][0]
-        matrix_carn = np.zeros(dim)
-
-        for loc, cell in self.map.items():
-            if not cell.migration_possible:
-                continue
-            matrix_carn[loc[0] - 1][loc[1] - 1] = len(cell.carnivores)
-        return matrix_carn
+        return self.carnivore_counter.cells
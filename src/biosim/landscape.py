@@ -23,20 +23,40 @@ four subclass attributes. The cells will also have their own numerical location.
 __author__ = "Sathuriyan Sivathas & Lavanyan Rathy"
 __email__ = "sathuriyan.sivathas@nmbu.no & lavanyan.rathy@nmbu.no"
 
-import random
+import bisect
+import math
 
-from biosim.animals import Herbivore, Carnivore
+import numpy as np
+
+from biosim.animals import Herbivore, Carnivore, global_rng
+from biosim.parameters import ParameterDict, FodderParameters
+from biosim.population import Population
 
 
 class Landscape:
     """Superclass for the landscape in Biosim"""
     __slots__ = (
-        "param", "herbivores", "carnivores", "fodder", "kill_probability",
-        "migrate_probability", "neighbors")
+        "param", "herbivore_population", "carnivore_population", "fodder",
+        "kill_probability", "migrate_probability", "neighbors", "neighbor_count", "rng",
+        "arrivals")
 
-    parameters_fodder = {"f_max": 0}
+    parameters_fodder = ParameterDict({"f_max": 0})
     migration_possible = True
 
+    _prey_block = 16
+    """Number of herbivores a carnivore tries at once, doubled every time none of them is killed"""
+
+    annual_stages = (("new_fodder", "eat_fodder"),
+                     ("prey",),
+                     ("newborn_herbivore", "newborn_carnivore"),
+                     ("migrated_animals",),
+                     ("merge_arrivals",),
+                     ("aging_population", "weight_loss", "death_population"))
+    """
+    The methods of the annual cycle, grouped in stages. A stage is finished in every cell of the
+    island before the next stage starts.
+    """
+
     @classmethod
     def set_parameters_fodder(cls, added_parameters):
         """
@@ -52,21 +72,83 @@ class Landscape:
                 raise ValueError("Inputted parameters for fodder can not be negative!")
             cls.parameters_fodder[parameter] = value
 
-        cls.parameters_fodder.update(added_parameters)
+        cls.compile_parameters()
+
+    @classmethod
+    def compile_parameters(cls):
+        """
+        Make a new read-only snapshot of the parameters of the landscape type.
+
+        Returns
+        -------
+        compiled: FodderParameters
+            The parameters as attributes, with the version of the parameter dictionary
+        """
+        compiled = FodderParameters(cls.parameters_fodder)
+        cls._compiled_parameters = compiled
+        return compiled
+
+    @classmethod
+    def compiled_parameters(cls):
+        """
+        The read-only snapshot of the parameters of the landscape type. A new snapshot is made if
+        the parameters have changed since the last one.
 
-    def __init__(self):
+        Returns
+        -------
+        compiled: FodderParameters
+            The parameters as attributes, with the version of the parameter dictionary
+        """
+        compiled = cls.__dict__.get("_compiled_parameters")
+        if compiled is None or compiled.version != cls.parameters_fodder.version:
+            compiled = cls.compile_parameters()
+        return compiled
+
+    def __init__(self, rng=None):
         """Constructor for the Landscape class
 
-        Empty list to count the population, and here will we append the new values every year.
-        Food count starts at f_max which will be updated every year.
+        Empty populations for each species, stored as arrays, and here will we append the new
+        values every year. Food count starts at f_max which will be updated every year.
+
+        Parameters
+        ----------
+        rng: numpy.random.Generator
+            Random number generator for the annual cycle of the cell. The island gives all its
+            cells the generator of the simulation, one seeded from the global NumPy random state
+            is made if None.
         """
         self.param = None
-        self.herbivores = []
-        self.carnivores = []
-        self.fodder = self.parameters_fodder["f_max"]
+        self.herbivore_population = Population(Herbivore)
+        self.carnivore_population = Population(Carnivore)
+        self.fodder = self.compiled_parameters().f_max
         self.kill_probability = None
         self.migrate_probability = 0
         self.neighbors = []
+        self.neighbor_count = None
+        self.rng = rng if rng is not None else global_rng()
+        self.arrivals = {}
+
+    @property
+    def herbivores(self):
+        """
+        Tuple with a view of every herbivore in the cell.
+
+        The views read and write the population arrays, and are valid until the next stage of
+        the annual cycle changes the population. Animals are added or removed through
+        :attr:`herbivore_population`, see :meth:`population_update`.
+        """
+        return tuple(self.herbivore_population)
+
+    @property
+    def carnivores(self):
+        """
+        Tuple with a view of every carnivore in the cell.
+
+        The views read and write the population arrays, and are valid until the next stage of
+        the annual cycle changes the population. Animals are added or removed through
+        :attr:`carnivore_population`, see :meth:`population_update`.
+        """
+        return tuple(self.carnivore_population)
 
     def population_update(self, population_list):
         """
@@ -77,15 +159,21 @@ class Landscape:
         population_list : list
                     This will put separately put the species in their respective lists.
         """
-        for individual in population_list:
-            if individual["species"] == "Herbivore":
-                self.herbivores.append(Herbivore(age=individual["age"],
-                                                 weight=individual["weight"]))
-
-        for individual in population_list:
-            if individual["species"] == "Carnivore":
-                self.carnivores.append(Carnivore(age=individual["age"],
-                                                 weight=individual["weight"]))
+        for population in (self.herbivore_population, self.carnivore_population):
+            name = population.species.__name__
+            if not any(individual["species"] == name for individual in population_list):
+                continue
+            parameters = population.species.compiled_parameters()
+            ages = []
+            weights = []
+            for individual in population_list:
+                if individual["species"] == name:
+                    ages.append(0 if individual["age"] is None else individual["age"])
+                    if individual["weight"] is None:
+                        weights.append(self.rng.normal(parameters.w_birth, parameters.sigma_birth))
+                    else:
+                        weights.append(individual["weight"])
+            population.extend(ages, weights)
 
     def display_herbivores(self):
         """
@@ -97,7 +185,7 @@ class Landscape:
             The herbivore count
 
         """
-        return len(self.herbivores)
+        return len(self.herbivore_population)
 
     def display_carnivores(self):
         """
@@ -109,18 +197,17 @@ class Landscape:
             The carnivores count
 
         """
-        return len(self.carnivores)
+        return len(self.carnivore_population)
 
     def new_fodder(self):
         """Function to add the parameter "f_max" every year in Lowland and Highland"""
-        self.fodder = self.parameters_fodder["f_max"]
+        self.fodder = self.compiled_parameters().f_max
 
     def eat_fodder(self):
         r"""
         Function to reduce the fodder after the herbivore are pleased with themselves.
-        Then remove the fodder amount that have been consumed by the herbivores
-        Using random shuffle to let the herbivores eat in a random order, and break the loop
-        if the fodder amount is on 0
+        Then remove the fodder amount that have been consumed by the herbivores.
+        The fittest herbivores eat first, and the feeding stops when the fodder amount is on 0
 
         :math:`F` is the amount of food the animals can eat
 
@@ -134,134 +221,399 @@ class Landscape:
         if :math:`fodder < F`
             Here will the animal eat to there is no more fodder since the F is bigger than
             available fodder
+
+        Only the :math:`\lceil fodder / F \rceil` fittest herbivores can get anything to eat.
+        They are picked with a partial selection, so the work grows with the number of fed
+        animals, and the fodder is given out with a cumulative sum of the appetites. A small
+        population is fed one animal at a time instead. Of herbivores with the same fitness, the
+        first one in the population eats first in both cases, so they give the same result.
         """
+        herbivores = self.herbivore_population
+        individual_count = len(herbivores)
+        if individual_count == 0 or self.fodder <= 0:
+            return
+
+        parameters = herbivores.species.compiled_parameters()
+        appetite = parameters.F
+        if appetite > 0:
+            fed_count = min(individual_count, math.ceil(self.fodder / appetite))
+        else:
+            fed_count = individual_count
+
+        if individual_count <= herbivores.scalar_size:
+            fitness = herbivores.fitness_values()
+            fed = sorted(range(individual_count), key=fitness.__getitem__, reverse=True)
+            fed = fed[:fed_count]
+            weight = herbivores.weight
+            eaten = 0
+            for count, index in enumerate(fed, 1):
+                total = min(count * appetite, self.fodder)
+                weight[index] += parameters.beta * (total - eaten)
+                eaten = total
+            self.fodder -= eaten
+            herbivores.invalidate_fitness(fed)
+            return
+
+        unfitness = -herbivores.fitness
+        if fed_count < individual_count:
+            threshold = np.partition(unfitness, fed_count - 1)[fed_count - 1]
+            fed = unfitness < threshold
+            tied = np.flatnonzero(unfitness == threshold)
+            fed[tied[:fed_count - np.count_nonzero(fed)]] = True
+            fed = np.flatnonzero(fed)
+        else:
+            fed = np.arange(individual_count)
+        fed = fed[np.argsort(unfitness[fed], kind="stable")]
+
+        eaten = np.minimum(np.arange(1, fed_count + 1) * appetite, self.fodder)
+        food = np.diff(eaten, prepend=0)
+        self.fodder -= eaten[-1]
+
+        herbivores.weight[fed] += parameters.beta * food
+        herbivores.invalidate_fitness(fed)
 
-        self.herbivores.sort(key=lambda x: "fitness", reverse=True)
+    def prey(self):
+        r"""
+        Method for the prey of a herbivore by the carnivore. They will eat to their appetite fills,
+        with the formula: :math:`w_{herbi-eaten} \geq F`
 
-        for individual in self.herbivores:
+        The carnivores hunt in random order, and each one tries the herbivores from the weakest
+        to the fittest. The fitness of the herbivores is kept sorted, so a binary search splits
+        them into three bands for a carnivore with fitness :math:`\Phi_{carn}`:
 
-            if self.fodder == 0:
-                break
+        * always killed, where :math:`\Phi_{carn} - \Phi_{herb} \geq \Delta\Phi_{max}`,
+        * killed with probability :math:`(\Phi_{carn} - \Phi_{herb}) / \Delta\Phi_{max}`,
+        * never killed, where :math:`\Phi_{herb} > \Phi_{carn}`.
 
-            if self.fodder >= individual.parameters_animal["F"]:
-                individual.weight_increase(individual.parameters_animal["F"])
-                self.fodder -= individual.parameters_animal["F"]
+        A hunt ends at the never-kill band, so only the herbivores a carnivore actually tries
+        are looked at. The random numbers are drawn for a block of herbivores at a time, see
+        :meth:`_first_kill`. The bands move after every kill, since eating makes the carnivore
+        fitter, and its new fitness is calculated with plain Python numbers. The killed
+        herbivores are marked, and removed from the population in one go when all the carnivores
+        have hunted.
+        """
+        herbivores = self.herbivore_population
+        carnivores = self.carnivore_population
+        herbivore_count = len(herbivores)
+        if herbivore_count == 0 or len(carnivores) == 0:
+            return
+
+        if len(carnivores) > 1:
+            carnivores.reorder(self.rng.permutation(len(carnivores)))
+        if herbivore_count <= herbivores.scalar_size:
+            fitness = herbivores.fitness_values()
+            order = sorted(range(herbivore_count), key=fitness.__getitem__)
+            herbivore_fitness = [fitness[index] for index in order]
+            carnivores_fitness = carnivores.fitness_values()
+        else:
+            order = np.argsort(herbivores.fitness, kind="stable").tolist()
+            herbivore_fitness = herbivores.fitness[order].tolist()
+            carnivores_fitness = carnivores.fitness.tolist()
+        herbivore_weight = herbivores.weight.tolist()
+        killed = [False] * herbivore_count
+        first_alive = 0
+
+        species = carnivores.species
+        parameters = species.compiled_parameters()
+        appetite = parameters.F
+        beta = parameters.beta
+        carnivores_age = carnivores.age.tolist()
+        carnivores_weight = carnivores.weight.tolist()
+
+        for index_carnivore, carnivore_age in enumerate(carnivores_age):
+            while first_alive < herbivore_count and killed[first_alive]:
+                first_alive += 1
 
-            elif self.fodder < individual.parameters_animal["F"]:
-                individual.weight_increase(self.fodder)
-                self.fodder = 0
+            ate = 0
+            carnivore_weight = carnivores_weight[index_carnivore]
+            carnivore_fitness = carnivores_fitness[index_carnivore]
+            reachable = bisect.bisect_right(herbivore_fitness, carnivore_fitness)
+            start = first_alive
+            block = self._prey_block
+
+            while start < reachable:
+                stop = min(reachable, start + block)
+                index = self._first_kill(carnivore_fitness, herbivore_fitness, killed, start,
+                                         stop, parameters.DeltaPhiMax)
+                if index is None:
+                    start = stop
+                    block *= 2
+                    continue
 
-    def prey(self):
+                killed[index] = True
+                prey_weight = herbivore_weight[order[index]]
+                if prey_weight < appetite:
+                    ate += prey_weight
+                    eating = prey_weight
+                else:
+                    eating = appetite - ate
+                    ate = appetite
+                carnivore_weight += beta * eating
+                carnivore_fitness = species.fitness_list([carnivore_age], [carnivore_weight],
+                                                         parameters)[0]
+                if ate >= appetite:
+                    break
+                reachable = bisect.bisect_right(herbivore_fitness, carnivore_fitness)
+                start = index + 1
+                block = self._prey_block
+
+            carnivores_weight[index_carnivore] = carnivore_weight
+            carnivores_fitness[index_carnivore] = carnivore_fitness
+
+        carnivores.weight = carnivores_weight
+        carnivores.fitness = carnivores_fitness
+        if True in killed:
+            keep = [True] * herbivore_count
+            for position, index in enumerate(order):
+                if killed[position]:
+                    keep[index] = False
+            herbivores.compact(keep)
+
+    def _first_kill(self, carnivore_fitness, herbivore_fitness, killed, start, stop,
+                    delta_phi_max):
         r"""
-        Method for the prey of a herbivore by the carnivore. They will eat to their appetite fills,
-        with the formula: :math:`w_{herbi-eaten} \geq F`
+        The first herbivore of a block that a carnivore kills, see :meth:`prey`.
+
+        Every herbivore of the block gets a uniform number, also the ones after the kill, so the
+        random numbers a hunt draws only depend on the blocks it tries.
+
+        Parameters
+        ----------
+        carnivore_fitness: float
+            The fitness of the carnivore.
+        herbivore_fitness: list
+            The fitness of the herbivores, sorted.
+        killed: list
+            True for the herbivores that are already killed, in the sorted order.
+        start, stop: int
+            The block of sorted herbivores to try.
+        delta_phi_max: float
+            The parameter :math:`\Delta\Phi_{max}` of the carnivore.
+
+        Returns
+        -------
+        index: int
+            The position of the killed herbivore in the sorted order, None if the carnivore
+            kills none of the block
         """
+        uniforms = self._uniforms(stop - start)
+        for index in range(start, stop):
+            if killed[index]:
+                continue
+            difference = carnivore_fitness - herbivore_fitness[index]
+            if (difference == 0 or difference >= delta_phi_max
+                    or uniforms[index - start] < difference / delta_phi_max):
+                return index
+        return None
+
+    def newborn_population(self, population):
+        r"""
+        Adding the newborns of one species to the population.
+        Only the animals that were in the cell at the start of the breeding season can give birth,
+        the newborns are added at the end in one go.
+        If the amount of the species is lower than 2 the function won't execute
 
-        random.shuffle(self.carnivores)
-        self.herbivores.sort(key=lambda x: x.fitness)
+        The whole population is handled with array operations. An animal gives birth when
 
-        for carnivore in self.carnivores:
-            ate = 0
+        * its weight is at least :math:`\zeta(w_{birth} + \sigma_{birth})`,
+        * a uniform number is below :math:`min(1, \gamma \times \Phi \times (N-1))`, and
+        * the weight of the newborn times :math:`\xi` is below the weight of the mother,
 
-            for herbivore in self.herbivores:
-                kill_prob = carnivore.kill_probability(herbivore)
-                eating = 0
+        and the mother then loses :math:`\xi` times the weight of the newborn. A small population
+        is checked one animal at a time, with the same random numbers.
 
-                if herbivore.death:
-                    continue
-                if random.random() < kill_prob:
-                    herbivore.death = True
-                    if eating + herbivore.weight < carnivore.parameters_animal["F"]:
-                        ate += herbivore.weight
-                        eating = herbivore.weight
-                    else:
-                        eating = carnivore.parameters_animal["F"] - ate
-                        ate = carnivore.parameters_animal["F"]
-                    carnivore.weight_increase(eating)
-                if ate >= carnivore.parameters_animal["F"]:
-                    break
-            self.herbivores = [herbivore for herbivore in self.herbivores if not herbivore.death]
+        Parameters
+        ----------
+        population: Population
+            The population of the species that is breeding.
+        """
+        individual_count = len(population)
+
+        if individual_count < 2:
+            return False
+
+        parameters = population.species.compiled_parameters()
+        uniforms = self.rng.random(individual_count)
+        newborn_weights = self.rng.normal(parameters.w_birth, parameters.sigma_birth,
+                                          individual_count)
+        weight = population.weight
+        if individual_count <= population.scalar_size:
+            uniforms = uniforms.tolist()
+            newborn_weights = newborn_weights.tolist()
+            fitness = population.fitness_values()
+            mothers = []
+            for index, mother_weight in enumerate(weight.tolist()):
+                probability = min(1, parameters.gamma * fitness[index] * (individual_count - 1))
+                if (mother_weight >= parameters.birth_weight_limit
+                        and uniforms[index] < probability
+                        and newborn_weights[index] * parameters.xi < mother_weight):
+                    mothers.append(index)
+            if mothers:
+                newborn_weights = [newborn_weights[index] for index in mothers]
+                for index, newborn_weight in zip(mothers, newborn_weights):
+                    weight[index] -= parameters.xi * newborn_weight
+                population.invalidate_fitness(mothers)
+                population.extend([0] * len(mothers), newborn_weights)
+            return
+
+        probability = np.minimum(1, parameters.gamma * population.fitness
+                                 * (individual_count - 1))
+
+        born = weight >= parameters.birth_weight_limit
+        born &= uniforms < probability
+        born &= newborn_weights * parameters.xi < weight
+
+        mothers = np.flatnonzero(born)
+        newborn_weights = newborn_weights[mothers]
+        weight[mothers] -= parameters.xi * newborn_weights
+        population.invalidate_fitness(mothers)
+        population.extend(np.zeros(newborn_weights.shape[0], dtype=np.int64), newborn_weights)
 
     def newborn_herbivore(self):
         """
         Adding the newborn herbivore to the population list
-        Making a new list, then we can extend the population list
         If the amount of one species is lower than 2 the functions won't execute
         """
-        herbivore_count = len(self.herbivores)
-
-        if herbivore_count < 2:
-            return False
-
-        newborn_herbivore = []
-        if herbivore_count >= 2:
-            for individual in self.herbivores:
-                newborn = individual.birth(herbivore_count)
-                if newborn is not None:
-                    newborn_herbivore.append(newborn)
-        self.herbivores.extend(newborn_herbivore)
+        return self.newborn_population(self.herbivore_population)
 
     def newborn_carnivore(self):
         """
         Adding the newborn carnivore to the population list
-        Making a new list, then we can extend the population list
         If the amount of one species is lower than 2 the functions won't execute
         """
-        individual_count = len(self.carnivores)
-
-        if individual_count < 2:
-            return False
-
-        newborn_carnivore = []
-        if individual_count >= 2:
-            for individuals in self.carnivores:
-                newborn = individuals.birth(individual_count)
-                if newborn is not None:
-                    newborn_carnivore.append(newborn)
-        self.carnivores.extend(newborn_carnivore)
+        return self.newborn_population(self.carnivore_population)
 
     def migrated_animals(self):
+        r"""
+        The animals will move from one cell to another with probability :math:`\mu \Phi`.
+        Where the animal will move is decided by a random choice among the neighbors, and an
+        animal that picks a water cell stays.
+
+        The movers are drawn for the whole population at once, and a small population is
+        checked one animal at a time with the same random numbers. Only a few animals move, so
+        their destinations are drawn as uniform numbers scaled by the number of neighbors, each
+        neighbor gets its arrivals in one copy, and the movers are removed from this cell with
+        one compaction.
+
+        The arrivals are put in a buffer of the neighbor, see :meth:`arrivals_buffer`, so they
+        can not move again this year, and join the population when :meth:`merge_arrivals` is
+        called.
+
+        On an island the neighbors are only the land cells, and neighbor_count is the number of
+        all the neighbors: a choice past the land neighbors is water, and the animal stays.
+        """
+        if not self.neighbors:
+            return
+        if self.neighbor_count is None:
+            neighbor_count = len(self.neighbors)
+        else:
+            neighbor_count = self.neighbor_count
+
+        for species_population in ("herbivore_population", "carnivore_population"):
+            population = getattr(self, species_population)
+            individual_count = len(population)
+            if individual_count == 0:
+                continue
+            mu = population.species.compiled_parameters().mu
+            if individual_count <= population.scalar_size:
+                uniforms = self._uniforms(individual_count)
+                movers = [index for index, fitness in enumerate(population.fitness_values())
+                          if uniforms[index] < fitness * mu]
+            else:
+                movers = np.flatnonzero(self.rng.random(individual_count)
+                                        < population.fitness * mu).tolist()
+            if movers:
+                arrival_choices = [int(uniform * neighbor_count)
+                                   for uniform in self._uniforms(len(movers))]
+                self._move(species_population, population, movers, arrival_choices)
+
+    def _move(self, species_population, population, movers, arrival_choices):
+        """
+        Move the movers of a population to the neighbors they picked, see
+        :meth:`migrated_animals`.
+
+        Parameters
+        ----------
+        species_population: str
+            "herbivore_population" or "carnivore_population".
+        population: Population
+            The population the movers leave.
+        movers: list
+            The indices of the movers.
+        arrival_choices: list
+            The neighbor each mover picked, a choice past the land neighbors is water. A mover
+            with a choice that is not a neighbor stays.
+        """
+        arrivals = {}
+        for mover, choice in zip(movers, arrival_choices):
+            if 0 <= choice < len(self.neighbors) and self.neighbors[choice].migration_possible:
+                arrivals.setdefault(choice, []).append(mover)
+        if not arrivals:
+            return
+
+        keep = [True] * len(population)
+        for choice in sorted(arrivals):
+            self.neighbors[choice].arrivals_buffer(species_population, self).extend_from(
+                population, arrivals[choice])
+            for mover in arrivals[choice]:
+                keep[mover] = False
+        population.compact(keep)
+
+    def _uniforms(self, count):
+        """A list of count uniform numbers from the generator of the cell."""
+        if count == 1:
+            return [self.rng.random()]
+        return self.rng.random(count).tolist()
+
+    def arrivals_buffer(self, species_population, source):
         """
-        This is not how it should be done, but I have done it for now. Ask TA about a better way
-        of doing this.
+        Buffer for the animals of one species that arrive from a neighbor in the migration
+        stage. Every neighbor has its own buffer, which is kept from year to year.
 
-        The animals will move from one cell to another, we use the migration_probability
-        to determine to see the animals' movement probability. Where the animal will move
-        is decided by a random choice method.
+        Parameters
+        ----------
+        species_population: str
+            Name of the population the animals will join, "herbivore_population" or
+            "carnivore_population".
+        source: Landscape
+            The cell the animals come from.
 
         Returns
         -------
-
+        buffer: Population
+            The arrivals of the species from the source cell
         """
-        migrated_animals = []
-        for herbivore in self.herbivores:
-            if not herbivore.migrate and herbivore.migration_probability():
-                arrival_cell = random.choice(self.neighbors)
-                if arrival_cell.migration_possible:
-                    herbivore.migrate = True
-                    arrival_cell.herbivores.append(herbivore)
-                    migrated_animals.append(herbivore)
-        self.herbivores[:] = [herb for herb in self.herbivores if herb not in migrated_animals]
-
-        migrated_animals = []
-        for carnivore in self.carnivores:
-            if not carnivore.migrate and carnivore.migration_probability():
-                arrival_cell = random.choice(self.neighbors)
-                if arrival_cell.migration_possible:
-                    carnivore.migrate = True
-                    arrival_cell.carnivores.append(carnivore)
-                    migrated_animals.append(carnivore)
-        self.carnivores[:] = [carn for carn in self.carnivores if carn not in migrated_animals]
+        slot = self.neighbors.index(source) if source in self.neighbors else -1
+        buffer = self.arrivals.get((species_population, slot))
+        if buffer is None:
+            buffer = Population(getattr(self, species_population).species)
+            self.arrivals[(species_population, slot)] = buffer
+        return buffer
+
+    def merge_arrivals(self):
+        """
+        Add the animals that arrived in the migration stage to the populations of the cell, and
+        empty the buffers. The buffers are merged in the order of the neighbors, so the result
+        does not depend on the order the neighbors ran their migration in.
+        """
+        if not self.arrivals:
+            return
+        for (species_population, _), buffer in sorted(self.arrivals.items(),
+                                                      key=lambda item: item[0]):
+            if len(buffer):
+                getattr(self, species_population).extend_from(buffer, slice(None))
+                buffer.clear()
 
     def aging_population(self):
         """
         This function will age all the living population on Rossumøya
         every year since it common for both carnivores and herbivores.
-        Uses animals.py method aging.
         """
-
-        for individual in self.herbivores + self.carnivores:
-            individual.aging()
+        for population in (self.herbivore_population, self.carnivore_population):
+            if len(population) > population.scalar_size:
+                population.age += 1
+            elif len(population):
+                population.age = [age + 1 for age in population.age.tolist()]
 
     def weight_loss(self):
         """
@@ -270,15 +622,45 @@ class Landscape:
         :return: New weight after decreasing
         """
 
-        for individual in self.herbivores + self.carnivores:
-            individual.weight_decrease()
+        for population in (self.herbivore_population, self.carnivore_population):
+            if not len(population):
+                continue
+            eta = population.species.compiled_parameters().eta
+            if len(population) > population.scalar_size:
+                population.weight -= population.weight * eta
+            else:
+                population.weight = [weight - weight * eta
+                                     for weight in population.weight.tolist()]
 
     def death_population(self):
-        """Remove the animals that have died from the population list"""
-        self.herbivores = [individual for individual in self.herbivores
-                           if not individual.death_animal()]
-        self.carnivores = [individual for individual in self.carnivores
-                           if not individual.death_animal()]
+        r"""
+        Remove the animals that have died from the population. An animal with weight zero dies,
+        the others die with probability :math:`\omega(1 - \Phi)`.
+
+        The probabilities and the uniform numbers are drawn for the whole population at once,
+        and the survivors are moved together in place by :meth:`Population.compact`. A small
+        population is checked one animal at a time, with the same random numbers.
+        """
+        for population in (self.herbivore_population, self.carnivore_population):
+            individual_count = len(population)
+            if not individual_count:
+                continue
+            omega = population.species.compiled_parameters().omega
+            if individual_count <= population.scalar_size:
+                uniforms = self._uniforms(individual_count)
+                survived = [uniform >= (1 - fitness) * omega and weight != 0
+                            for uniform, fitness, weight in zip(
+                                uniforms, population.fitness_values(),
+                                population.weight.tolist())]
+                if False in survived:
+                    population.compact(survived)
+                continue
+
+            probability = 1 - population.fitness
+            probability *= omega
+            survived = self.rng.random(len(population)) >= probability
+            survived &= population.weight != 0
+            population.compact(survived)
 
     def annual_cycle(self):
         r"""
@@ -294,38 +676,33 @@ class Landscape:
 
         *Newborn babies:* Each species gets new babies
 
-        *Migration:* Each year the animals will move once
+        *Migration:* Each year the animals will move once, and the animals that arrived join
+        the cell when all the cells have had their migration
 
         *Aging:* Every animal will age +1 every year
 
         *Weight loss:* Every year the animals will lose weight by the formula :math:`\eta\omega`
 
+        The stages are listed in :attr:`annual_stages`. On an island they are run stage by stage
+        over all the cells by :meth:`biosim.island.Island.annual_cycle`.
         """
-        self.new_fodder()
-        self.eat_fodder()
-
-        self.prey()
-        self.newborn_herbivore()
-        self.newborn_carnivore()
-        self.migrated_animals()
-
-        self.aging_population()
-        self.weight_loss()
-        self.death_population()
+        for stage in self.annual_stages:
+            for method in stage:
+                getattr(self, method)()
 
 
 class Lowland(Landscape):
     """
     This class is a subclass of the Landscape class to portray the lowland.
     """
-    parameters_fodder = {"f_max": 800}
+    parameters_fodder = ParameterDict({"f_max": 800})
 
 
 class Water(Landscape):
     """
     This class is a subclass of the Landscape class to portray the water.
     """
-    parameters_fodder = {"f_max": 0}
+    parameters_fodder = ParameterDict({"f_max": 0})
     migration_possible = False
 
     def annual_cycle(self):
@@ -336,11 +713,11 @@ class Highland(Landscape):
     """
     This class is a subclass of the Landscape class to portray the highland.
     """
-    parameters_fodder = {"f_max": 300}
+    parameters_fodder = ParameterDict({"f_max": 300})
 
 
 class Desert(Landscape):
     """
     This class is a subclass of the Landscape class to portray the desert.
     """
-    parameters_fodder = {"f_max": 0}
+    parameters_fodder = ParameterDict({"f_max": 0})
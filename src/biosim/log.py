@@ -0,0 +1,220 @@
+# -*- encoding: utf-8 -*-
+"""
+:mod: 'biosim.log' writes a record of the island for every simulated year.
+
+The records are kept in a structured array and written to the log file in blocks, so the file is
+only touched every few years. The file is either CSV with a header line, or a compact binary
+file with the raw records behind a short header describing them.
+
+.. note::
+    This file contains the following and can be imported as a module:
+
+    * YearLog - Buffered writer of the yearly records of an island.
+    * read_log - Read a log file back as a structured array.
+"""
+__author__ = "Sathuriyan Sivathas & Lavanyan Rathy"
+__email__ = "sathuriyan.sivathas@nmbu.no & lavanyan.rathy@nmbu.no"
+
+import json
+
+import numpy as np
+
+from biosim.island import Island
+
+
+class YearLog:
+    """Buffered writer of the yearly records of an island"""
+    __slots__ = ("path", "file_format", "flush_years", "details", "dtype", "_records", "_count")
+
+    file_formats = ("csv", "binary")
+    binary_magic = b"BIOSIMLOG1\n"
+    """First line of a binary log file, followed by a line with the fields as JSON"""
+    species = (("herbivores", "herbivore_counter", "herbivore_snapshot"),
+               ("carnivores", "carnivore_counter", "carnivore_snapshot"))
+    statistics = ("fitness", "age", "weight")
+
+    def __init__(self, path, file_format="csv", flush_years=100, details=False, append=False):
+        """
+        The log file is created, or emptied, and gets its header right away. With append, the
+        records are added to the end of an existing log file instead.
+
+        Parameters
+        ----------
+        path: str
+            The log file.
+        file_format: str
+            "csv" or "binary".
+        flush_years: int
+            The number of records kept in memory before they are written to the file.
+        details: bool
+            If True, the records also have the counts of every species per landscape type, and
+            the mean fitness, age and weight of every species.
+        append: bool
+            If True and the file is not empty, keep its records and write after them.
+
+        :raises ValueError: The file format is unknown, flush_years is not positive, or the
+            file to append to has other fields
+        """
+        if file_format not in self.file_formats:
+            raise ValueError(f"The log file format must be one of {self.file_formats}!")
+        if flush_years < 1:
+            raise ValueError("The log must hold at least one year before it is written!")
+
+        self.path = path
+        self.file_format = file_format
+        self.flush_years = int(flush_years)
+        self.details = details
+        self.dtype = self.record_dtype(details)
+        self._records = np.zeros(self.flush_years, dtype=self.dtype)
+        self._count = 0
+
+        header = self.header()
+        if append:
+            try:
+                with open(path, "rb") as log_file:
+                    existing = log_file.read(len(header))
+            except FileNotFoundError:
+                existing = b""
+            if existing:
+                if existing != header:
+                    raise ValueError("The log file to append to has other fields!")
+                return
+        with open(path, "wb") as log_file:
+            log_file.write(header)
+
+    def header(self):
+        """
+        The first bytes of the log file, describing the fields of the records.
+
+        Returns
+        -------
+        header: bytes
+            The names of the fields as a CSV line, or the magic line and the fields as JSON for
+            a binary file
+        """
+        if self.file_format == "csv":
+            return (",".join(self.dtype.names) + "\n").encode()
+        return self.binary_magic + json.dumps(self.dtype.descr).encode() + b"\n"
+
+    @classmethod
+    def record_dtype(cls, details=False):
+        """
+        The fields of a record.
+
+        Parameters
+        ----------
+        details: bool
+            If True, add the counts per landscape type and the mean fitness, age and weight of
+            every species.
+
+        Returns
+        -------
+        dtype: numpy.dtype
+            Little-endian structured type of a record
+        """
+        fields = [("year", "<i8")] + [(name, "<i8") for name, _, _ in cls.species]
+        if details:
+            for name, _, _ in cls.species:
+                fields += [(f"{name}_{landscape}", "<i8") for _, landscape in cls.land_types()]
+            for name, _, _ in cls.species:
+                fields += [(f"{name}_mean_{statistic}", "<f8") for statistic in cls.statistics]
+        return np.dtype(fields)
+
+    @staticmethod
+    def land_types():
+        """
+        The landscape types animals can live in.
+
+        Returns
+        -------
+        land_types: list
+            The terrain code and lower case class name of every landscape type but water
+        """
+        return [(code, Island.landscape_types[letter].__name__.lower())
+                for code, letter in enumerate(Island.terrain_codes) if letter != "W"]
+
+    def __len__(self):
+        """The number of records not yet written to the file"""
+        return self._count
+
+    def record(self, year, island):
+        """
+        Add the record of one year, and write the buffer to the file when it is full.
+
+        The counts are read from the running counters of the island. Only with details are the
+        arrays of the animals collected, for the means.
+
+        Parameters
+        ----------
+        year: int
+            The year just simulated.
+        island: Island
+            The island to record.
+        """
+        record = self._records[self._count]
+        record["year"] = year
+        for name, counter, snapshot in self.species:
+            record[name] = getattr(island, counter).total
+
+        if self.details:
+            terrain = island.terrain.ravel()
+            for name, counter, snapshot in self.species:
+                counts = np.bincount(terrain, weights=getattr(island, counter).cells.ravel(),
+                                     minlength=len(Island.terrain_codes))
+                for code, landscape in self.land_types():
+                    record[f"{name}_{landscape}"] = counts[code]
+
+                animals = getattr(island, snapshot)()
+                for statistic in self.statistics:
+                    values = getattr(animals, statistic)
+                    record[f"{name}_mean_{statistic}"] = values.mean() if len(values) else np.nan
+
+        self._count += 1
+        if self._count == self.flush_years:
+            self.flush()
+
+    def flush(self):
+        """Write the records in the buffer to the file and empty the buffer."""
+        if not self._count:
+            return
+
+        records = self._records[:self._count]
+        if self.file_format == "csv":
+            formats = ["%d" if self.dtype[name].kind == "i" else "%.10g"
+                       for name in self.dtype.names]
+            with open(self.path, "a") as log_file:
+                np.savetxt(log_file, records, fmt=formats, delimiter=",")
+        else:
+            with open(self.path, "ab") as log_file:
+                log_file.write(records.tobytes())
+        self._count = 0
+
+
+def read_log(path):
+    """
+    Read a log file written by :class:`YearLog`, in either format.
+
+    Parameters
+    ----------
+    path: str
+        The log file.
+
+    Returns
+    -------
+    records: numpy.ndarray
+        Structured array with one record per logged year
+    """
+    with open(path, "rb") as log_file:
+        if log_file.read(len(YearLog.binary_magic)) == YearLog.binary_magic:
+            dtype = np.dtype([tuple(field) for field in json.loads(log_file.readline())])
+            return np.frombuffer(log_file.read(), dtype=dtype)
+
+    with open(path) as log_file:
+        names = log_file.readline().strip().split(",")
+        dtype = YearLog.record_dtype(details=len(names) > 1 + len(YearLog.species))
+        if list(dtype.names) != names:
+            raise ValueError("The header of the log file does not match the fields of a record!")
+        lines = log_file.read().splitlines()
+    if not lines:
+        return np.zeros(0, dtype=dtype)
+    return np.loadtxt(lines, delimiter=",", dtype=dtype, ndmin=1)
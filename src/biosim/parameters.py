@@ -0,0 +1,146 @@
+# -*- encoding: utf-8 -*-
+"""
+:mod: 'biosim.parameters' holds the parameters of the species and landscape types.
+
+The parameters are set as dictionaries, but the yearly stages read them from compiled
+snapshots where every parameter is an attribute. A snapshot is made when the parameters are set,
+and carries the version of the dictionary it was made from. Everything that depends on the
+parameters, like the fitness of the animals, checks this version to know if it is out of date.
+
+.. note::
+    This file contains the following classes and can be imported as a module:
+
+    * ParameterDict - Dictionary of parameters that counts how many times it has been changed.
+    * SpeciesParameters - Read-only snapshot of the parameters of an animal species.
+    * FodderParameters - Read-only snapshot of the parameters of a landscape type.
+"""
+__author__ = "Sathuriyan Sivathas & Lavanyan Rathy"
+__email__ = "sathuriyan.sivathas@nmbu.no & lavanyan.rathy@nmbu.no"
+
+import numpy as np
+
+
+class ParameterDict(dict):
+    """Dictionary of parameters that counts how many times it has been changed"""
+    __slots__ = ("version",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.version = 0
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.version += 1
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.version += 1
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.version += 1
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+
+class _CompiledParameters:
+    """Read-only snapshot of a parameter dictionary"""
+    __slots__ = ("version",)
+
+    _fields = ()
+
+    def __init__(self, parameters):
+        """
+        Parameters
+        ----------
+        parameters: ParameterDict
+            The parameters to take a snapshot of.
+        """
+        object.__setattr__(self, "version", parameters.version)
+        for field in self._fields:
+            object.__setattr__(self, field, parameters[field])
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Compiled parameters are read-only, set the parameters instead!")
+
+    def __repr__(self):
+        values = ", ".join(f"{field}={getattr(self, field)!r}" for field in self._fields)
+        return f"{type(self).__name__}(version={self.version}, {values})"
+
+
+class SpeciesParameters(_CompiledParameters):
+    """Read-only snapshot of the parameters of an animal species"""
+    _fields = ("w_birth", "sigma_birth", "beta", "eta", "a_half", "phi_age", "w_half",
+               "phi_weight", "mu", "gamma", "zeta", "xi", "omega", "F", "DeltaPhiMax")
+    __slots__ = _fields + ("birth_weight_limit", "age_table", "age_values")
+    age_table_size = 4096
+    """Most entries of the table of the age factor, older animals use the formula"""
+
+    def __init__(self, parameters, previous=None):
+        """
+        The table of the age factor is kept both as an array, age_table, and as a tuple of
+        floats, age_values, which is faster to read one age at a time.
+
+        Parameters
+        ----------
+        parameters: ParameterDict
+            The parameters of the species.
+        previous: SpeciesParameters
+            The snapshot this one replaces. Its tables of the age factor are reused if a_half
+            and phi_age have not changed.
+        """
+        super().__init__(parameters)
+        object.__setattr__(self, "birth_weight_limit",
+                           self.zeta * (self.w_birth + self.sigma_birth))
+
+        if previous is not None and (previous.a_half, previous.phi_age) == (self.a_half,
+                                                                            self.phi_age):
+            age_table = previous.age_table
+            age_values = previous.age_values
+        else:
+            age_table = self.build_age_table(self.a_half, self.phi_age, self.age_table_size)
+            age_values = tuple(age_table.tolist())
+        object.__setattr__(self, "age_table", age_table)
+        object.__setattr__(self, "age_values", age_values)
+
+    @staticmethod
+    def build_age_table(a_half, phi_age, size=None):
+        r"""
+        Build the table of the age factor :math:`q^{+}(a, a_{\frac{1}{2}}, \phi_{age})` for every
+        integer age.
+
+        The table ends at the first age where :math:`e^{\phi_{age}(a - a_{\frac{1}{2}})}`
+        overflows, which makes the age factor exactly 0, or after size entries if that comes
+        first. The age factor of older animals is calculated with the formula.
+
+        Parameters
+        ----------
+        a_half: float
+            The age where the age factor is one half.
+        phi_age: float
+            How fast the age factor falls with age.
+        size: int
+            The most entries of the table, no limit if None.
+
+        Returns
+        -------
+        table: numpy.ndarray
+            The age factor, indexed by age
+        """
+        largest_exponent = np.log(np.finfo(np.float64).max)
+        oldest = max(int(np.floor(a_half + largest_exponent / phi_age)) + 1, 0)
+        if size is not None:
+            oldest = min(oldest, size - 1)
+
+        ages = np.arange(oldest + 1, dtype=np.float64)
+        with np.errstate(over="ignore"):
+            table = 1 / (1 + np.exp(phi_age * (ages - a_half)))
+        table.flags.writeable = False
+        return table
+
+
+class FodderParameters(_CompiledParameters):
+    """Read-only snapshot of the parameters of a landscape type"""
+    _fields = ("f_max",)
+    __slots__ = _fields
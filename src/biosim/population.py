@@ -0,0 +1,631 @@
+# -*- encoding: utf-8 -*-
+"""
+:mod: 'biosim.population' holds the animals of one species in one cell as NumPy arrays.
+
+Instead of keeping one :class:`biosim.animals.Animal` object per animal, a cell stores the
+age, weight, fitness and the death flag of each species in contiguous arrays. The
+yearly stages in :mod:`biosim.landscape` work directly on these arrays.
+
+.. note::
+    This file contains the following class and can be imported as a module:
+
+    * Population - Structure-of-arrays store for the animals of one species in one cell.
+      Indexing or iterating a population gives thin views that behave like the animal
+      objects of the species, so existing callers and tests keep working.
+    * PopulationCounter - Number of animals of one species in every cell of a grid and in
+      total, kept up to date by the populations bound to it.
+    * PopulationSnapshot - Read-only arrays with the age, weight, fitness and cell of the
+      animals of one species on the whole island.
+"""
+__author__ = "Sathuriyan Sivathas & Lavanyan Rathy"
+__email__ = "sathuriyan.sivathas@nmbu.no & lavanyan.rathy@nmbu.no"
+
+import numpy as np
+
+
+class Population:
+    """Structure-of-arrays store for the animals of one species in one cell"""
+    __slots__ = ("species", "_size", "_fitness_version", "_counter", "_counter_index",
+                 "_age", "_weight", "_fitness", "_stale", "_death")
+
+    _columns = {"_age": np.int64,
+                "_weight": np.float64,
+                "_fitness": np.float64,
+                "_stale": np.bool_,
+                "_death": np.bool_}
+
+    scalar_size = 24
+    """
+    Populations up to this size are worked on with plain Python numbers, since array operations
+    on a few animals cost more than the arithmetic
+    """
+
+    def __init__(self, species, capacity=0):
+        """
+        Constructor for the Population class.
+
+        Parameters
+        ----------
+        species: type
+            The animal class (Herbivore or Carnivore) stored in this population.
+        capacity: int
+            Number of animals to allocate room for up front.
+        """
+        self.species = species
+        self._size = 0
+        self._counter = None
+        self._counter_index = None
+        self._fitness_version = species.parameters_animal.version
+        for column, dtype in self._columns.items():
+            if capacity:
+                setattr(self, column, np.zeros(capacity, dtype=dtype))
+            else:
+                setattr(self, column, _empty_columns[column])
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index):
+        """
+        Thin view of the animal at the given index.
+
+        The view reads and writes the arrays of this population, and is only valid until the
+        population is compacted or reordered.
+        """
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("Population index out of range")
+        return _view_class(self.species)(self, index)
+
+    def __iter__(self):
+        view = _view_class(self.species)
+        for index in range(self._size):
+            yield view(self, index)
+
+    def __repr__(self):
+        return f"Population({self.species.__name__}, size={self._size})"
+
+    @property
+    def age(self):
+        """Ages of the animals."""
+        return self._age[:self._size]
+
+    @age.setter
+    def age(self, value):
+        self._age[:self._size] = value
+        self._stale[:self._size] = True
+
+    @property
+    def weight(self):
+        """Weights of the animals."""
+        return self._weight[:self._size]
+
+    @weight.setter
+    def weight(self, value):
+        self._weight[:self._size] = value
+        self._stale[:self._size] = True
+
+    @property
+    def fitness(self):
+        """
+        Fitness of the animals.
+
+        Fitness that is out of date, because the age or weight changed or the parameters of the
+        species were set, is recalculated when it is read: in one batch, or with
+        :meth:`fitness_values` in a population of at most :attr:`scalar_size` animals.
+        """
+        if self._size <= self.scalar_size:
+            self.fitness_values()
+            return self._fitness[:self._size]
+
+        if self._fitness_version != self.species.parameters_animal.version:
+            self._fitness_version = self.species.parameters_animal.version
+            self._stale[:self._size] = True
+        stale = self._stale[:self._size]
+        if stale.any():
+            self.update_fitness(stale)
+        return self._fitness[:self._size]
+
+    @fitness.setter
+    def fitness(self, value):
+        self._fitness[:self._size] = value
+        self._stale[:self._size] = False
+
+    @property
+    def death(self):
+        """Flags for the animals that have died this year."""
+        return self._death[:self._size]
+
+    @death.setter
+    def death(self, value):
+        self._death[:self._size] = value
+
+    def update_fitness(self, selected=None):
+        """
+        Recalculate the fitness with the batch formula of the species.
+
+        Parameters
+        ----------
+        selected: array_like
+            Boolean mask or integer indices of the animals to update, all animals if None.
+        """
+        if selected is None:
+            selected = slice(None)
+        age = self._age[:self._size][selected]
+        weight = self._weight[:self._size][selected]
+        self._fitness[:self._size][selected] = self.species.fitness_batch(age, weight)
+        self._stale[:self._size][selected] = False
+
+    def fitness_values(self):
+        """
+        Fitness of the animals of a small population, as a list of floats.
+
+        Fitness that is out of date is recalculated with
+        :meth:`biosim.animals.Animal.fitness_list` and stored, like when :attr:`fitness` is read.
+
+        Returns
+        -------
+        fitness: list
+            The fitness of every animal
+        """
+        size = self._size
+        if self._fitness_version != self.species.parameters_animal.version:
+            self._fitness_version = self.species.parameters_animal.version
+            self._stale[:size] = True
+        stale = self._stale[:size].tolist()
+        if True not in stale:
+            return self._fitness[:size].tolist()
+
+        ages = self._age[:size].tolist()
+        weights = self._weight[:size].tolist()
+        if False not in stale:
+            fitness = self.species.fitness_list(ages, weights)
+            self._fitness[:size] = fitness
+            self._stale[:size] = False
+            return fitness
+
+        fitness = self._fitness[:size].tolist()
+        for index, out_of_date in enumerate(stale):
+            if out_of_date:
+                fitness[index] = self.species.fitness_list([ages[index]], [weights[index]])[0]
+                self._fitness[index] = fitness[index]
+                self._stale[index] = False
+        return fitness
+
+    def invalidate_fitness(self, selected=None):
+        """
+        Mark the fitness as out of date, so it is recalculated the next time it is read.
+
+        Parameters
+        ----------
+        selected: array_like
+            Boolean mask or integer indices of the animals to mark, all animals if None. The
+            animals of a short list of indices are marked one at a time.
+        """
+        if selected is None:
+            self._stale[:self._size] = True
+        elif isinstance(selected, list) and len(selected) <= self.scalar_size:
+            for index in selected:
+                self._stale[index] = True
+        else:
+            self._stale[:self._size][selected] = True
+
+    def reserve(self, capacity):
+        """
+        Make sure there is room for at least capacity animals without reallocating.
+
+        Parameters
+        ----------
+        capacity: int
+            The number of animals the arrays must be able to hold.
+        """
+        current = self._age.shape[0]
+        if capacity <= current:
+            return
+        capacity = max(capacity, 2 * current, 8)
+        for column, dtype in self._columns.items():
+            grown = np.zeros(capacity, dtype=dtype)
+            grown[:self._size] = getattr(self, column)[:self._size]
+            setattr(self, column, grown)
+
+    def append(self, animal):
+        """
+        Copy the state of one animal object into the population. The fitness is calculated
+        when it is needed.
+
+        Raises ValueError if the age of the animal is not a non-negative integer.
+
+        Parameters
+        ----------
+        animal: Animal
+            An animal (or a view of an animal) of the species of this population.
+        """
+        self._check_ages([animal.age])
+        self.reserve(self._size + 1)
+        index = self._size
+        self._age[index] = animal.age
+        self._weight[index] = animal.weight
+        self._stale[index] = True
+        self._death[index] = animal.death
+        self._resize(self._size + 1)
+
+    def extend(self, age, weight):
+        """
+        Add several animals at once. Their fitness is calculated when it is needed.
+
+        Parameters
+        ----------
+        age: array_like
+            Ages of the new animals.
+        weight: array_like
+            Weights of the new animals.
+        """
+        if isinstance(age, list) and isinstance(weight, list) and len(age) <= self.scalar_size:
+            if len(age) != len(weight):
+                raise ValueError("Age and weight must have the same length!")
+            self._check_ages(age)
+            start = self._size
+            self.reserve(start + len(age))
+            for offset, (age_value, weight_value) in enumerate(zip(age, weight), start):
+                self._age[offset] = age_value
+                self._weight[offset] = weight_value
+                self._stale[offset] = True
+                self._death[offset] = False
+            self._resize(start + len(age))
+            return
+
+        age = np.asarray(age)
+        weight = np.asarray(weight, dtype=np.float64)
+        if age.shape != weight.shape:
+            raise ValueError("Age and weight must have the same length!")
+        if np.any(age < 0) or np.any(age != np.floor(age)):
+            raise ValueError("The age of an animal must be a non-negative integer!")
+
+        start = self._size
+        stop = start + age.shape[0]
+        self.reserve(stop)
+        self._age[start:stop] = age
+        self._weight[start:stop] = weight
+        self._stale[start:stop] = True
+        self._death[start:stop] = False
+        self._resize(stop)
+
+    def extend_from(self, other, selected):
+        """
+        Copy the selected animals of another population to the end of this population.
+
+        Parameters
+        ----------
+        other: Population
+            The population to copy from.
+        selected: array_like
+            Boolean mask or integer indices of the animals to copy. The animals of a short list
+            of indices are copied one at a time.
+        """
+        other.fitness  # brings fitness that is out of date up to date before copying
+        if isinstance(selected, list) and len(selected) <= self.scalar_size:
+            start = self._size
+            self.reserve(start + len(selected))
+            for column in self._columns:
+                source = getattr(other, column)
+                target = getattr(self, column)
+                for offset, index in enumerate(selected, start):
+                    target[offset] = source[index]
+            self._resize(start + len(selected))
+            return
+
+        values = {column: getattr(other, column)[:other._size][selected]
+                  for column in self._columns}
+        start = self._size
+        stop = start + values["_age"].shape[0]
+        self.reserve(stop)
+        for column, value in values.items():
+            getattr(self, column)[start:stop] = value
+        self._resize(stop)
+
+    def mask(self, selected):
+        """
+        New population with the selected animals of this population.
+
+        Parameters
+        ----------
+        selected: array_like
+            Boolean mask or integer indices of the animals to select.
+
+        Returns
+        -------
+        population: Population
+            A new population holding copies of the selected animals.
+        """
+        population = Population(self.species)
+        population.extend_from(self, selected)
+        return population
+
+    def compact(self, keep):
+        """
+        Remove animals in place, keeping only the ones given by a boolean mask.
+
+        The order of the remaining animals is kept and the freed slots are reused by later
+        additions. Only the animals after the first removed one are moved.
+
+        Parameters
+        ----------
+        keep: array_like
+            Boolean mask with True for the animals that should stay. A list is handled with
+            plain Python in a small population.
+        """
+        if isinstance(keep, list) and self._size <= self.scalar_size:
+            if all(keep):
+                return
+            first = keep.index(False)
+            survivors = [index for index in range(first + 1, self._size) if keep[index]]
+            for column in self._columns:
+                array = getattr(self, column)
+                for position, index in enumerate(survivors, first):
+                    array[position] = array[index]
+            self._resize(first + len(survivors))
+            return
+
+        keep = np.asarray(keep, dtype=bool)
+        removed = np.flatnonzero(~keep)
+        if removed.shape[0] == 0:
+            return
+
+        first = removed[0]
+        survivors = np.flatnonzero(keep[first:])
+        survivors += first
+        remaining = self._size - removed.shape[0]
+        for column in self._columns:
+            array = getattr(self, column)
+            array[first:remaining] = array[survivors]
+        self._resize(remaining)
+
+    def reorder(self, order):
+        """
+        Rearrange the animals in place.
+
+        Parameters
+        ----------
+        order: array_like
+            Permutation of the indices of the population.
+        """
+        order = np.asarray(order, dtype=np.intp)
+        for column in self._columns:
+            array = getattr(self, column)
+            array[:self._size] = array[:self._size][order]
+
+    def clear(self):
+        """Remove all the animals, keeping the allocated room."""
+        self._resize(0)
+
+    @classmethod
+    def gather(cls, populations):
+        """
+        The animals of several populations, one after the other, as one array per column.
+
+        Parameters
+        ----------
+        populations: list
+            The populations to gather.
+
+        Returns
+        -------
+        columns: dict
+            The arrays age, weight, fitness, stale and death
+        """
+        columns = {}
+        for column, dtype in cls._columns.items():
+            arrays = [getattr(population, column)[:population._size]
+                      for population in populations]
+            columns[column[1:]] = np.concatenate(arrays) if arrays else np.zeros(0, dtype=dtype)
+        return columns
+
+    def restore(self, columns, start, stop):
+        """
+        Replace the animals by a slice of the arrays from :meth:`gather`.
+
+        Parameters
+        ----------
+        columns: dict
+            The arrays of the animals, by column.
+        start, stop: int
+            The slice of the animals of this population.
+        """
+        size = stop - start
+        self.clear()
+        self.reserve(size)
+        for column in self._columns:
+            getattr(self, column)[:size] = columns[column[1:]][start:stop]
+        self._resize(size)
+
+    def bind_counter(self, counter, index):
+        """
+        Count the animals of this population in a counter from now on.
+
+        Parameters
+        ----------
+        counter: PopulationCounter
+            The counter of the species.
+        index: int
+            The flat index of the cell of this population in the grid of the counter.
+        """
+        self._counter = counter
+        self._counter_index = index
+        counter.add(index, self._size)
+
+    @staticmethod
+    def _check_ages(ages):
+        """
+        Raise ValueError unless all the ages are non-negative integers, so none is truncated
+        when it is stored in the integer column of the ages.
+        """
+        if any(value < 0 or value % 1 != 0 for value in ages):
+            raise ValueError("The age of an animal must be a non-negative integer!")
+
+    def _resize(self, size):
+        """Set the number of animals, and update the counter if the population has one."""
+        if self._counter is not None:
+            self._counter.add(self._counter_index, size - self._size)
+        self._size = size
+
+
+class PopulationCounter:
+    """
+    Number of animals of one species in every cell of a grid, and in total.
+
+    The populations bound to the counter update it every time their size changes, so reading
+    the counts costs nothing, however often it is done.
+    """
+    __slots__ = ("_cells", "_flat_cells", "total")
+
+    def __init__(self, shape):
+        """
+        Parameters
+        ----------
+        shape: tuple
+            The shape of the grid of cells.
+        """
+        self._cells = np.zeros(shape, dtype=np.int64)
+        self._flat_cells = self._cells.reshape(-1)
+        self.total = 0
+
+    @property
+    def cells(self):
+        """Read-only view of the number of animals in every cell."""
+        cells = self._cells.view()
+        cells.flags.writeable = False
+        return cells
+
+    def add(self, index, change):
+        """
+        Add to the count of one cell.
+
+        Parameters
+        ----------
+        index: int
+            The flat index of the cell in the grid.
+        change: int
+            The number of animals added, negative if animals were removed.
+        """
+        self._flat_cells[index] += change
+        self.total += change
+
+
+class PopulationSnapshot:
+    """
+    Read-only arrays with the age, weight, fitness and cell of the animals of one species.
+
+    The arrays are taken from the populations without making animal objects, and are only valid
+    until the next stage of the annual cycle changes the populations.
+    """
+    __slots__ = ("age", "weight", "fitness", "cell")
+
+    def __init__(self, populations, cells):
+        """
+        Parameters
+        ----------
+        populations: list
+            The populations of the species, one for each cell.
+        cells: list
+            The flat index of the cell of each population.
+        """
+        occupied = [(population, cell) for population, cell in zip(populations, cells)
+                    if len(population)]
+        columns = (("age", np.int64), ("weight", np.float64), ("fitness", np.float64))
+        if len(occupied) == 1:
+            population = occupied[0][0]
+            arrays = [getattr(population, name).view() for name, _ in columns]
+        elif occupied:
+            arrays = [np.concatenate([getattr(population, name) for population, _ in occupied])
+                      for name, _ in columns]
+        else:
+            arrays = [np.zeros(0, dtype=dtype) for _, dtype in columns]
+        self.age, self.weight, self.fitness = arrays
+        self.cell = np.repeat(np.array([cell for _, cell in occupied], dtype=np.intp),
+                              [len(population) for population, _ in occupied])
+        for array in (self.age, self.weight, self.fitness, self.cell):
+            array.flags.writeable = False
+
+    def __len__(self):
+        return self.age.shape[0]
+
+
+_empty_columns = {column: np.zeros(0, dtype=dtype) for column, dtype in Population._columns.items()}
+"""
+Shared arrays for populations without room. They have no elements to write to, and are
+replaced when the population grows.
+"""
+
+
+def _array_property(column, doc):
+    """Property reading and writing one element of a population column."""
+
+    def fget(self):
+        return getattr(self._population, column)[self._index]
+
+    def fset(self, value):
+        getattr(self._population, column)[self._index] = value
+
+    return property(fget, fset, doc=doc)
+
+
+def _state_property(column, doc):
+    """Property for age or weight, where writing makes the fitness out of date."""
+
+    def fget(self):
+        return getattr(self._population, column)[self._index]
+
+    def fset(self, value):
+        getattr(self._population, column)[self._index] = value
+        self._population._stale[self._index] = True
+
+    return property(fget, fset, doc=doc)
+
+
+def _fitness_get(self):
+    population = self._population
+    if (population._stale[self._index]
+            or population._fitness_version != population.species.parameters_animal.version):
+        return population.fitness[self._index]
+    return population._fitness[self._index]
+
+
+def _fitness_set(self, value):
+    self._population._fitness[self._index] = value
+    self._population._stale[self._index] = False
+
+
+def _view_init(self, population, index):
+    self._population = population
+    self._index = index
+
+
+def _view_repr(self):
+    return f"{type(self).__name__}(age={self.age}, weight={self.weight})"
+
+
+_view_classes = {}
+
+
+def _view_class(species):
+    """
+    Class of the thin views for a species.
+
+    The view class is a subclass of the species, so every method of the animal works on a
+    view, but age, weight, fitness and death are read from the population arrays.
+    """
+    view = _view_classes.get(species)
+    if view is None:
+        view = type(species.__name__, (species,), {
+            "__slots__": ("_population", "_index"),
+            "__init__": _view_init,
+            "__repr__": _view_repr,
+            "__module__": __name__,
+            "age": _state_property("_age", "Age of the animal."),
+            "weight": _state_property("_weight", "Weight of the animal."),
+            "fitness": property(_fitness_get, _fitness_set, doc="Fitness of the animal."),
+            "death": _array_property("_death", "True if the animal has died."),
+        })
+        _view_classes[species] = view
+    return view
@@ -7,13 +7,14 @@ This script will provide us with simulation of Rossumøya.
 __author__ = "Sathuriyan Sivathas & Lavanyan Rathy"
 __email__ = "sathuriyan.sivathas@nmbu.no & lavanyan.rathy@nmbu.no"
 
-import random
+import json
+import numbers
 
-from matplotlib import pyplot as plt
+import numpy as np
 
 from biosim.animals import Carnivore, Herbivore
 from biosim.island import Island, Water, Lowland, Highland, Desert
-from biosim.visualization import Visualization
+from biosim.log import YearLog
 
 """
 simulation.py is highly inspired by Hans Ekkehard Plesser´s
@@ -31,26 +32,42 @@ The template for this file is also given by Hans Ekkehard Plesser.
 
 class BioSim:
     """Class for BioSim"""
+    checkpoint_version = 2
+    """Version of the checkpoint file format"""
+    animal_species = {"Herbivore": Herbivore, "Carnivore": Carnivore}
+    landscape_types = {"W": Water, "L": Lowland, "H": Highland, "D": Desert}
+    """The species and landscape types, by the names their parameters are set with"""
     __slots__ = ("_img_count", "_img_base", "island_map", "island", "_current_year",
-                 "vis_years", "img_fmt", "visualization", "_img_fmt")
+                 "vis_years", "img_fmt", "visualization", "_img_fmt", "seed", "log", "verbose")
 
     def __init__(self, island_map, ini_pop, seed,
                  vis_years=1, ymax_animals=None, cmax_animals=None, hist_specs=None,
                  img_dir=None, img_base=None, img_fmt='png', img_years=None,
-                 log_file=None):
+                 log_file=None, log_format="csv", log_flush_years=100, log_details=False,
+                 log_append=False, verbose=False):
         """
         :param island_map: Multi-line string specifying island geography
         :param ini_pop: List of dictionaries specifying initial population
-        :param seed: Integer used as random number seed
+        :param seed: Integer used as random number seed, every cell of the island gets its own
+            random number stream spawned from it
         :param ymax_animals: Number specifying y-axis limit for graph showing animal numbers
         :param cmax_animals: Dict specifying color-code limits for animal densities
         :param hist_specs: Specifications for histograms, see below
-        :param vis_years: years between visualization updates (if 0, disable graphics)
+        :param vis_years: years between visualization updates (if 0, disable graphics, and
+            matplotlib is never imported)
         :param img_dir: String with path to directory for figures
         :param img_base: String with beginning of file name for figures
         :param img_fmt: String with file type for figures, e.g. 'png'
         :param img_years: years between visualizations saved to files (default: vis_years)
         :param log_file: If given, write animal counts to this file
+        :param log_format: Format of the log file, 'csv' or 'binary'
+        :param log_flush_years: Number of years kept in memory before they are written to the
+            log file
+        :param log_details: If True, also log the counts per landscape type and the mean
+            fitness, age and weight of every species
+        :param log_append: If True, add the records to the end of an existing log file instead
+            of emptying it
+        :param verbose: If True, print the number of animals per species every year
 
         If ymax_animals is None, the y-axis limit should be adjusted automatically.
         If cmax_animals is None, sensible, fixed default values should be used.
@@ -70,9 +87,13 @@ class BioSim:
         where img_number are consecutive image numbers starting from 0.
 
         img_dir and img_base must either be both None or both strings.
+
+        The log file gets one record per simulated year, see :class:`biosim.log.YearLog`, and
+        can be read back with :func:`biosim.log.read_log`. The records are written every
+        log_flush_years years and at the end of every call to simulate.
         """
         self._img_count = None
-        random.seed(seed)
+        self.seed = seed
 
         if img_dir is None:
             pass
@@ -83,7 +104,7 @@ class BioSim:
             self._img_base = None
 
         self.island_map = island_map
-        self.island = Island(island_map)
+        self.island = Island(island_map, seed=seed)
 
         if ini_pop is not None:
             self.island.population_cell(ini_pop)
@@ -91,9 +112,20 @@ class BioSim:
         self._current_year = 0
         self.vis_years = vis_years
         self.img_fmt = img_fmt if img_fmt is not None else "png"
+        self.verbose = verbose
+
+        if log_file is not None:
+            self.log = YearLog(log_file, log_format, log_flush_years, log_details, log_append)
+        else:
+            self.log = None
+
+        if vis_years:
+            from biosim.visualization import Visualization
 
-        self.visualization = Visualization(ymax_animals, cmax_animals, hist_specs, img_dir,
-                                           img_base, img_fmt, img_years)
+            self.visualization = Visualization(ymax_animals, cmax_animals, hist_specs, img_dir,
+                                               img_base, img_fmt, img_years)
+        else:
+            self.visualization = None
 
     @staticmethod
     def set_animal_parameters(species, params):
@@ -129,24 +161,121 @@ class BioSim:
         else:
             raise ValueError("Choose a valid landscape type!")
 
+    @classmethod
+    def parameter_state(cls):
+        """
+        All the parameters of the species and landscape types, as plain dictionaries.
+
+        :return: Dict with the parameters of every species under "species", and of every
+            landscape type, by code letter, under "landscapes"
+        """
+        return {"species": {name: dict(species.parameters_animal)
+                            for name, species in cls.animal_species.items()},
+                "landscapes": {letter: dict(landscape.parameters_fodder)
+                               for letter, landscape in cls.landscape_types.items()}}
+
+    @classmethod
+    def restore_parameters(cls, parameters):
+        """
+        Set the parameters of the species and landscape types from :meth:`parameter_state`.
+
+        The parameters were checked when they were first set, so they are copied as they are.
+
+        :param parameters: Dict with the parameters of the species and landscape types
+        """
+        for name, values in parameters["species"].items():
+            species = cls.animal_species[name]
+            species.parameters_animal.update(values)
+            species.compile_parameters()
+        for letter, values in parameters["landscapes"].items():
+            landscape = cls.landscape_types[letter]
+            landscape.parameters_fodder.update(values)
+            landscape.compile_parameters()
+
     def simulate(self, num_years):
         """
         Run simulation while visualizing the result.
 
+        The graphics are updated every vis_years years, but the line graph of the counts gets
+        the counts of every year. Without graphics (vis_years=0) only the annual cycle is run.
+
         :param num_years: number of years to simulate
         """
-        self.visualization.setup(self._current_year + num_years, 1, self.island_map)
+        if self.visualization is not None:
+            self.visualization.setup(self._current_year + num_years, 1, self.island_map)
         for num_year in range(self._current_year, self._current_year + num_years):
             self.island.annual_cycle()
-            print(self.num_animals_per_species)
-
-            self.visualization.update(self._current_year, self.num_animals_per_species,
-                                      self.island.matrix_herbivores(),
-                                      self.island.matrix_carnivores(),
-                                      self.island.get_all_herbivores(),
-                                      self.island.get_all_carnivores())
+            if self.log is not None:
+                self.log.record(self._current_year + 1, self.island)
+            if self.verbose:
+                print(self.num_animals_per_species)
+
+            if self.visualization is not None:
+                if self._current_year % self.vis_years == 0:
+                    self.visualization.update(self._current_year, self.num_animals_per_species,
+                                              self.island.matrix_herbivores(),
+                                              self.island.matrix_carnivores(),
+                                              self.island.herbivore_snapshot(),
+                                              self.island.carnivore_snapshot())
+                else:
+                    self.visualization.update_counts(self._current_year,
+                                                     self.num_animals_per_species)
             self._current_year += 1
 
+        if self.log is not None:
+            self.log.flush()
+
+    def save_checkpoint(self, path):
+        """
+        Save the state of the simulation to a file, to be resumed with :meth:`load_checkpoint`.
+
+        The file is an uncompressed NumPy archive with the animals of all cells in one array per
+        property, and a header with the map, the year, the seed and the parameters of the
+        species and landscape types. The random numbers of every year follow from the seed and
+        the year, so the resumed simulation gives the same results as one that was never
+        stopped.
+
+        :param path: Name of the checkpoint file
+        """
+        state, arrays = self.island.checkpoint()
+        header = {"version": self.checkpoint_version,
+                  "year": self._current_year,
+                  "island_map": self.island_map,
+                  "seed": int(self.seed) if isinstance(self.seed, numbers.Integral) else None,
+                  "island": state}
+        header.update(self.parameter_state())
+        with open(path, "wb") as checkpoint:
+            np.savez(checkpoint, header=np.frombuffer(json.dumps(header).encode(),
+                                                      dtype=np.uint8), **arrays)
+
+    @classmethod
+    def load_checkpoint(cls, path, **kwargs):
+        """
+        Resume a simulation saved by :meth:`save_checkpoint`.
+
+        The parameters of the species and landscape types are set to the ones in the checkpoint,
+        see :meth:`restore_parameters`. A log file is appended to, not emptied, unless
+        log_append=False is given.
+
+        :param path: Name of the checkpoint file
+        :param kwargs: Other arguments of BioSim, like vis_years or log_file
+        :return: The simulation as it was when it was saved
+        :raises ValueError: The file is a checkpoint of another version
+        """
+        with np.load(path) as checkpoint:
+            header = json.loads(checkpoint["header"].tobytes())
+            if header["version"] != cls.checkpoint_version:
+                raise ValueError(f"Checkpoint version {header['version']} can not be read!")
+            arrays = {name: checkpoint[name] for name in checkpoint.files if name != "header"}
+
+        cls.restore_parameters(header)
+
+        kwargs.setdefault("log_append", True)
+        sim = cls(header["island_map"], ini_pop=None, seed=header["seed"], **kwargs)
+        sim.island.restore(header["island"], arrays)
+        sim._current_year = header["year"]
+        return sim
+
     def add_population(self, population):
         """
         Add a population to the island
@@ -167,17 +296,19 @@ class BioSim:
 
     @property
     def num_animals_per_species(self):
-        """Number of animals per species in island, as dictionary."""
-        animal_count_per_species = {"Herbivore": 0, "Carnivore": 0}
+        """
+        Number of animals per species in island, as dictionary.
 
-        for loc, landscape in self.island.map.items():
-            animal_count_per_species["Herbivore"] += len(landscape.herbivores)
-            animal_count_per_species["Carnivore"] += len(landscape.carnivores)
-        return animal_count_per_species
+        The totals are running counters of the island, so this takes the same time however big
+        the island and its population are.
+        """
+        return {"Herbivore": self.island.herbivore_counter.total,
+                "Carnivore": self.island.carnivore_counter.total}
 
     def save_fig(self):
         if self._img_base is None:
             return
+        from matplotlib import pyplot as plt
 
         plt.savefig('{base}_{num:05d}.{type}'.format(base=self._img_base,
                                                      num=self._img_count,
@@ -186,5 +317,7 @@ class BioSim:
 
     def make_movie(self):
         """Create MPEG4 movie from visualization images saved."""
+        if self.visualization is None:
+            raise RuntimeError("There are no images without graphics, vis_years is 0!")
 
         self.visualization.make_movie()
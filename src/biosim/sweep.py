@@ -0,0 +1,266 @@
+# -*- encoding: utf-8 -*-
+"""
+:mod: 'biosim.sweep' runs one scenario for many sets of parameters and keeps the results on disk.
+
+A point of a sweep is a set of changed parameters, e.g. ``{("Carnivore", "F"): 40}``. Every
+point is simulated for every seed, in parallel, and the yearly counts of each simulation are
+saved in the cache directory. The file name is a hash of everything the counts depend on: the
+map, the initial population, all the parameters, the seed, the number of years and the version
+of the results, see :attr:`ParameterSweep.results_version`. A simulation that is already in the
+cache is never run again, so overlapping sweeps only run the new points.
+
+.. note::
+    This file contains the following and can be imported as a module:
+
+    * parameter_grid - All the points of a grid of parameter values.
+    * ParameterSweep - Runs the points of a sweep in parallel, with a cache on disk.
+"""
+__author__ = "Sathuriyan Sivathas & Lavanyan Rathy"
+__email__ = "sathuriyan.sivathas@nmbu.no & lavanyan.rathy@nmbu.no"
+
+import hashlib
+import itertools
+import json
+import os
+
+import numpy as np
+
+import biosim
+from biosim.ensemble import island_counts, run_tasks, scenario_parameters
+from biosim.island import Island
+from biosim.simulation import BioSim
+
+_scenario = None
+"""The island, initial population and number of years of the sweep run by this process"""
+
+
+def parameter_grid(axes):
+    """
+    All the points of a grid of parameter values.
+
+    Parameters
+    ----------
+    axes: dict
+        The values of every parameter of the grid, by (species name or landscape letter,
+        parameter), e.g. ``{("Carnivore", "F"): [10, 50], ("L", "f_max"): [400, 800]}``.
+
+    Returns
+    -------
+    points: list
+        One dict of parameter values for every combination of the values of the axes
+    """
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*axes.values())]
+
+
+def _start_worker(island_map, ini_pop, num_years):
+    """Parse the map in the worker, before it runs any point."""
+    global _scenario
+    _scenario = (Island(island_map), ini_pop, num_years)
+
+
+def _run_point(task):
+    """Set the parameters of a task and return its yearly counts."""
+    parameters, seed = task
+    island, ini_pop, num_years = _scenario
+    BioSim.restore_parameters(parameters)
+    island.reset(seed)
+    return island_counts(island, ini_pop, num_years)
+
+
+def _json_value(value):
+    """Turn the NumPy numbers json can not write into Python numbers."""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} can not be part of a scenario!")
+
+
+class ParameterSweep:
+    """
+    Runs the points of a parameter sweep in parallel, with a cache of the results on disk.
+
+    After every run, simulated is the number of simulations that were not in the cache.
+    """
+    __slots__ = ("island_map", "ini_pop", "num_years", "cache_dir", "processes", "simulated")
+    results_version = 2
+    """
+    Version of the cached results. It must be raised by every change of the model or of the
+    random number streams that changes the counts of a seed, so older results are not used.
+    """
+
+    def __init__(self, island_map, ini_pop, num_years, cache_dir, processes=None):
+        """
+        Parameters
+        ----------
+        island_map: str
+            Multi-line string with the geography of the island.
+        ini_pop: list
+            The initial population.
+        num_years: int
+            The number of years to simulate every point.
+        cache_dir: str
+            Directory of the cached results, made if it does not exist.
+        processes: int
+            The number of worker processes, the number of CPUs if None. With one process the
+            simulations run in this process.
+        """
+        self.island_map = island_map
+        self.ini_pop = ini_pop
+        self.num_years = num_years
+        self.cache_dir = cache_dir
+        self.processes = processes
+        self.simulated = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def split_point(point):
+        """
+        Sort the parameters of a point into parameters of species and of landscape types.
+
+        Parameters
+        ----------
+        point: dict
+            Parameter values by (species name or landscape letter, parameter).
+
+        Returns
+        -------
+        species_parameters: dict
+            The parameters of every species in the point, by species name
+        landscape_parameters: dict
+            The parameters of every landscape type in the point, by letter
+        """
+        species_parameters = {}
+        landscape_parameters = {}
+        for (name, parameter), value in point.items():
+            if name in BioSim.landscape_types:
+                landscape_parameters.setdefault(name, {})[parameter] = value
+            else:
+                species_parameters.setdefault(name, {})[parameter] = value
+        return species_parameters, landscape_parameters
+
+    def cache_key(self, parameters, seed):
+        """
+        The hash of everything the result of a simulation depends on.
+
+        Parameters
+        ----------
+        parameters: dict
+            All the parameters, see :meth:`biosim.simulation.BioSim.parameter_state`.
+        seed: int
+            The seed of the simulation.
+
+        Returns
+        -------
+        key: str
+            SHA-256 hash, as hexadecimal digits
+        """
+        scenario = {"version": self.results_version,
+                    "package": biosim.__version__,
+                    "island_map": self.island_map,
+                    "ini_pop": self.ini_pop,
+                    "num_years": self.num_years,
+                    "parameters": parameters,
+                    "seed": seed}
+        text = json.dumps(scenario, sort_keys=True, default=_json_value)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def cache_path(self, key):
+        """The file of the cached result with the given key."""
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def load(self, key):
+        """
+        The cached result with the given key.
+
+        Parameters
+        ----------
+        key: str
+            The key of the result.
+
+        Returns
+        -------
+        counts: numpy.ndarray
+            The yearly counts, None if they are not in the cache or can not be read
+        """
+        try:
+            counts = np.load(self.cache_path(key))
+        except (OSError, ValueError):
+            return None
+        if counts.shape != (self.num_years + 1, len(BioSim.animal_species)):
+            return None
+        return counts
+
+    def store(self, key, counts):
+        """
+        Save a result in the cache. The file is written under another name first, so a
+        stopped sweep never leaves half a file behind.
+
+        Parameters
+        ----------
+        key: str
+            The key of the result.
+        counts: numpy.ndarray
+            The yearly counts.
+        """
+        path = self.cache_path(key)
+        partial = f"{path}.{os.getpid()}.partial"
+        with open(partial, "wb") as cache_file:
+            np.save(cache_file, counts)
+        os.replace(partial, path)
+
+    def run(self, points, seeds=(0,)):
+        """
+        The yearly counts of every point and seed, simulating only what is not in the cache.
+
+        The same point and seed are only simulated once, also when they occur several times.
+        Every result is saved as soon as it is done, so a stopped sweep keeps what it has done.
+
+        Parameters
+        ----------
+        points: list
+            The points, dicts of parameter values by (species name or landscape letter,
+            parameter), e.g. from :func:`parameter_grid`.
+        seeds: list
+            The seeds to simulate every point with.
+
+        Returns
+        -------
+        counts: numpy.ndarray
+            Array of shape (len(points), len(seeds), num_years + 1, 2) with the number of
+            herbivores and carnivores at the start and after every year
+        """
+        global _scenario
+        points = list(points)
+        seeds = list(seeds)
+        counts = np.zeros((len(points), len(seeds), self.num_years + 1,
+                           len(BioSim.animal_species)), dtype=np.int64)
+
+        pending = {}
+        for point_index, point in enumerate(points):
+            parameters = scenario_parameters(*self.split_point(point))
+            for seed_index, seed in enumerate(seeds):
+                key = self.cache_key(parameters, seed)
+                if key in pending:
+                    pending[key][2].append((point_index, seed_index))
+                    continue
+                cached = self.load(key)
+                if cached is not None:
+                    counts[point_index, seed_index] = cached
+                else:
+                    pending[key] = (parameters, seed, [(point_index, seed_index)])
+
+        self.simulated = len(pending)
+        tasks = [(parameters, seed) for parameters, seed, _ in pending.values()]
+        results = run_tasks(_run_point, tasks, self.processes, _start_worker,
+                            (self.island_map, self.ini_pop, self.num_years))
+        keys = iter(pending)
+        try:
+            for result in results:
+                key = next(keys)
+                self.store(key, result)
+                for point_index, seed_index in pending[key][2]:
+                    counts[point_index, seed_index] = result
+        finally:
+            results.close()
+            _scenario = None
+        return counts
@@ -102,43 +102,41 @@ class Visualization:
         self._count_weight_ax = None
         self._year_ax = None
         self.yearly_disp_text = None
+        self._img_herb_axis = None
+        self._img_carni_axis = None
+        self._hist_edges = {}
+        self._hist_steps = {}
+        self._background = None
+        self._blit = False
 
     def update(self, step, cnt_animals, herb_map,
-               carn_map, h_list, c_list):  # Very important method, sys_map will be matrix
+               carn_map, herbivores, carnivores):  # Very important method, sys_map will be matrix
         """
         Updates graphics with current data and save to file if necessary.
 
         :param step: current time step (current year)
-        :param sys_map: current system status (2d array)
-        :param sys_mean: current mean value of system
+        :param cnt_animals: number of animals per species
+        :param herb_map: number of herbivores in each cell (2d array)
+        :param carn_map: number of carnivores in each cell (2d array)
+        :param herbivores: snapshot with the age, weight and fitness arrays of the herbivores
+        :param carnivores: snapshot with the age, weight and fitness arrays of the carnivores
         """
         self._update_count_graph(step, cnt_animals["Herbivore"], cnt_animals["Carnivore"])
 
         self.heat_map_carnivores(carn_map)
         self.heat_map_herbivores(herb_map)
 
-        fitness_herb = [h.fitness for h in h_list]
-        fitness_carn = [c.fitness for c in c_list]
-        self.histo_fitness_update(fitness_herb, fitness_carn)
-
-        age_herb = [h.age for h in h_list]
-        age_carn = [c.age for c in c_list]
-        self.histo_age_update(age_herb, age_carn)
-
-        weight_herb = [h.weight for h in h_list]
-        weight_carn = [c.weight for c in c_list]
-        self.histo_weight_update(weight_herb, weight_carn)
+        rescaled = [self.histo_fitness_update(herbivores.fitness, carnivores.fitness),
+                    self.histo_age_update(herbivores.age, carnivores.age),
+                    self.histo_weight_update(herbivores.weight, carnivores.weight)]
 
         self.update_yearly_counter(step)
 
-        self._fig.canvas.flush_events()
-        plt.pause(1e-5)
-        plt.tight_layout()
+        self._draw(full=any(rescaled))
         if self.save_years is not None:
             if step % self.save_years == 0:
                 self._save_graphics()
 
-
     def make_movie(self, movie_fmt=None):
         """
         Creates MPEG4 movie from visualization images saved.
@@ -273,19 +271,19 @@ class Visualization:
         if self._count_fitness_ax is None:
             self._count_fitness_ax = self._fig.add_subplot(3, 3, 7)
             self._count_fitness_ax.set_title("Fitness")
-            self._img_count_fit_axis = None
+            self._setup_histogram("fitness", self._count_fitness_ax)
 
         # Histogram for age(herbivores, carnivores).
         if self._count_age_ax is None:
             self._count_age_ax = self._fig.add_subplot(3, 3, 8)
             self._count_age_ax.set_title("Age")
-            self._img_count_age_axis = None
+            self._setup_histogram("age", self._count_age_ax)
 
         # Histogram for weight(herbivores, carnivores).
         if self._count_weight_ax is None:
             self._count_weight_ax = self._fig.add_subplot(3, 3, 9)
             self._count_weight_ax.set_title("Weight")
-            self._img_count_weight_axis = None
+            self._setup_histogram("weight", self._count_weight_ax)
 
         if self._year_ax is None:
             self._year_ax = self._fig.add_subplot(3, 3, 2)
@@ -296,6 +294,118 @@ class Visualization:
                                                          transform=self._year_ax.transAxes)
             self._year_ax.axis('off')
 
+        # The heat maps get their images and color bars here, so the layout is only computed
+        # once and the updates only change the data.
+        map_lines = island_map.splitlines()
+        empty_map = np.zeros((len(map_lines), len(map_lines[0]) if map_lines else 0))
+        if self._img_herb_axis is None:
+            self.heat_map_herbivores(empty_map)
+        if self._img_carni_axis is None:
+            self.heat_map_carnivores(empty_map)
+
+        self._fig.tight_layout()
+        self._setup_drawing()
+
+    def _setup_histogram(self, prop, ax):
+        """
+        Make the histograms of one property, a step outline for every species over the fixed
+        bins from hist_specs. The updates only change the heights of the steps.
+
+        :param prop: 'fitness', 'age' or 'weight'
+        :param ax: the axes of the histograms
+        """
+        spec = self.hist_specs.get(prop, self.default_specs[prop])
+        bins = int(spec["max"] // spec["delta"])
+        edges = np.linspace(0, spec["max"], bins + 1)
+        self._hist_edges[prop] = edges
+        self._hist_steps[prop] = (ax.stairs(np.zeros(bins), edges, color="blue",
+                                            label="Herbivore"),
+                                  ax.stairs(np.zeros(bins), edges, color="red",
+                                            label="Carnivore"))
+        ax.set_xlim(0, spec["max"])
+        ax.set_ylim(0, 1)
+        ax.legend()
+
+    def _update_histogram(self, prop, herbivores, carnivores):
+        """
+        Count the animals in the bins of one property and set the heights of the steps.
+
+        The y-axis grows when a bin does not fit and shrinks when the highest bin is below a
+        quarter of it, otherwise it stays, so most years the axes need not be drawn again.
+
+        :param prop: 'fitness', 'age' or 'weight'
+        :param herbivores: the values of the herbivores
+        :param carnivores: the values of the carnivores
+        :return: True if the y-axis was changed
+        """
+        edges = self._hist_edges[prop]
+        highest = 0
+        for steps, values in zip(self._hist_steps[prop], (herbivores, carnivores)):
+            counts, _ = np.histogram(values, bins=edges)
+            steps.set_data(counts)
+            highest = max(highest, counts.max(initial=0))
+
+        ax = self._hist_steps[prop][0].axes
+        top = ax.get_ylim()[1]
+        new_top = max(1.2 * highest, 1)
+        if highest > top or (highest < top / 4 and new_top != top):
+            ax.set_ylim(0, new_top)
+            return True
+        return False
+
+    def _dynamic_artists(self):
+        """The artists that change every update."""
+        artists = [self._herb_line, self._carn_line, self._img_herb_axis, self._img_carni_axis,
+                   self._yearly_count_disp]
+        for steps in self._hist_steps.values():
+            artists.extend(steps)
+        return artists
+
+    def _setup_drawing(self):
+        """
+        Decide how the updates are drawn. Without a window there is nothing to draw, the
+        figure is only drawn when it is saved. A window is updated by blitting if the backend
+        supports it: the figure without the changing artists is kept as a background, and only
+        the changing artists are drawn on top of it.
+        """
+        canvas = self._fig.canvas
+        if canvas.required_interactive_framework is None:
+            return
+
+        if not self._blit and canvas.supports_blit:
+            self._blit = True
+            for artist in self._dynamic_artists():
+                artist.set_animated(True)
+            canvas.mpl_connect("draw_event", self._on_draw)
+        plt.show(block=False)
+        canvas.draw()
+        canvas.flush_events()
+
+    def _on_draw(self, event):
+        """Keep the new background after a full draw, and draw the changing artists on it."""
+        self._background = self._fig.canvas.copy_from_bbox(self._fig.bbox)
+        for artist in self._dynamic_artists():
+            self._fig.draw_artist(artist)
+
+    def _draw(self, full=False):
+        """
+        Show the updated artists in the window, if there is one.
+
+        :param full: True if the axes have changed, so the whole figure must be drawn again
+        """
+        canvas = self._fig.canvas
+        if canvas.required_interactive_framework is None:
+            return
+
+        if self._blit and not full and self._background is not None:
+            canvas.restore_region(self._background)
+            for artist in self._dynamic_artists():
+                self._fig.draw_artist(artist)
+            canvas.blit(self._fig.bbox)
+        else:
+            canvas.draw()
+        canvas.flush_events()
+
     def heat_map_herbivores(self, herb_matrix):
         """Update the 2D-view of the system.
         This is the heatmap for herbivores.
@@ -326,6 +436,16 @@ class Visualization:
             plt.colorbar(self._img_carni_axis, ax=self._heat_carnivore_ax,
                          orientation='vertical')
 
+    def update_counts(self, step, cnt_animals):
+        """
+        Put the counts of a time step in the line graph, without drawing it. The counts are
+        shown at the next :meth:`update`.
+
+        :param step: current time step (current year)
+        :param cnt_animals: number of animals per species
+        """
+        self._update_count_graph(step, cnt_animals["Herbivore"], cnt_animals["Carnivore"])
+
     def _update_count_graph(self, step, count_h, count_c):
 
         y_data = self._herb_line.get_ydata()
@@ -339,37 +459,16 @@ class Visualization:
         self._carn_line.set_ydata(y_data)
 
     def histo_fitness_update(self, herbivores, carnivores):
-
-        self._count_fitness_ax.clear()
-        self._count_fitness_ax.set_title("Fitness")
-        bins = int(self.hist_specs["fitness"]["max"] // self.hist_specs["fitness"]["delta"])
-        self._count_fitness_ax.hist(herbivores, bins=bins, color="blue", histtype="step",
-                                    label="Herbivore", range=(0, self.hist_specs["fitness"]["max"]))
-        self._count_fitness_ax.hist(carnivores, bins=bins, color="red", histtype="step",
-                                    label="Carnivore", range=(0, self.hist_specs["fitness"]["max"]))
-        self._count_fitness_ax.legend()
+        """Update the fitness histograms, see :meth:`_update_histogram`."""
+        return self._update_histogram("fitness", herbivores, carnivores)
 
     def histo_age_update(self, herbivores, carnivores):
-
-        self._count_age_ax.clear()
-        self._count_age_ax.set_title("Age")
-        bins = int(self.hist_specs["age"]["max"] // self.hist_specs["age"]["delta"])
-        self._count_age_ax.hist(herbivores, bins=bins, color="blue", histtype="step",
-                                label="Herbivore", range=(0, self.hist_specs["age"]["max"]))
-        self._count_age_ax.hist(carnivores, bins=bins, color="red", histtype="step",
-                                label="Carnivore", range=(0, self.hist_specs["age"]["max"]))
-        self._count_age_ax.legend()
+        """Update the age histograms, see :meth:`_update_histogram`."""
+        return self._update_histogram("age", herbivores, carnivores)
 
     def histo_weight_update(self, herbivores, carnivores):
-
-        self._count_weight_ax.clear()
-        self._count_weight_ax.set_title("Weight")
-        bins = int(self.hist_specs["weight"]["max"] // self.hist_specs["weight"]["delta"])
-        self._count_weight_ax.hist(herbivores, bins=bins, color="blue", histtype="step",
-                                   label="Herbivore", range=(0, self.hist_specs["weight"]["max"]))
-        self._count_weight_ax.hist(carnivores, bins=bins, color="red", histtype="step",
-                                   label="Carnivore", range=(0, self.hist_specs["weight"]["max"]))
-        self._count_weight_ax.legend()
+        """Update the weight histograms, see :meth:`_update_histogram`."""
+        return self._update_histogram("weight", herbivores, carnivores)
 
     def update_yearly_counter(self, year):
 
@@ -378,10 +477,17 @@ class Visualization:
     def _save_graphics(self):
         """Saves graphics to file if file name given."""
 
-        plt.savefig('{base}_{num:05d}.{type}'.format(base=self._img_base,
-                                                     num=self._img_ctr,
-                                                     type=self._img_fmt))
+        # Animated artists are left out of saved figures, so they are made normal while saving.
+        for artist in self._dynamic_artists() if self._blit else []:
+            artist.set_animated(False)
+        self._fig.savefig('{base}_{num:05d}.{type}'.format(base=self._img_base,
+                                                           num=self._img_ctr,
+                                                           type=self._img_fmt))
         self._img_ctr += 1
+        if self._blit:
+            for artist in self._dynamic_artists():
+                artist.set_animated(True)
+            self._fig.canvas.draw()
 
     def map_graphics_plot(self, island_map):
         #                   R    G    B
@@ -8,8 +8,6 @@ carnivores.
 __author__ = "Sathuriyan Sivathas & Lavanyan Rathy"
 __email__ = "sathuriyan.sivathas@nmbu.no & lavanyan.rathy@nmbu.no"
 
-import random
-
 import numpy as np
 import pytest
 from scipy import stats
@@ -34,8 +32,8 @@ def test_gaussian_distribution():
     """
     Check if the weight of the babies actually is a gaussian distribution.
     """
-    random.seed(12345)
-    weights = [Herbivore().weight_baby() for _ in range(5000)]
+    rng = np.random.default_rng(12345)
+    weights = [Herbivore().weight_baby(rng) for _ in range(5000)]
 
     numpy_weights = np.array(weights)
 
@@ -97,6 +95,145 @@ def test_fitness_herbivores_zero_weight():
     assert herbivore2.fitness == 0
 
 
+def test_fitness_batch_equals_scalar():
+    """
+    Test that the batch fitness of a whole array is exactly the fitness of each single animal,
+    also when the weight is zero.
+    """
+    ages = np.array([0, 1, 5, 40, 80, 200])
+    weights = np.array([0.0, 3.2, 10.0, 25.5, 0.0, 60.0])
+
+    batch = Carnivore.fitness_batch(ages, weights)
+    scalar = [Carnivore(age, weight).fitness for age, weight in zip(ages, weights)]
+
+    assert list(batch) == scalar
+    assert batch[0] == 0 and batch[4] == 0
+
+
+def test_fitness_list_equals_batch():
+    """
+    Test that the fitness of a few animals calculated with plain Python numbers is exactly the
+    batch fitness.
+    """
+    ages = [0, 1, 5, 40, 80, 200, 5000]
+    weights = [0.0, 3.2, 10.0, 25.5, 0.0, 60.0, 20.0]
+
+    batch = Carnivore.fitness_batch(ages, weights).tolist()
+
+    assert Carnivore.fitness_list(ages, weights) == batch
+
+
+def test_fitness_list_equals_batch_for_many_animals():
+    """
+    Test that the plain Python fitness is exactly the batch fitness for many random animals, a
+    few at a time, also for ages that are not in the table.
+    """
+    rng = np.random.default_rng(2022)
+    ages = rng.integers(0, 60, 20000).tolist()
+    weights = rng.uniform(0, 80, 20000).tolist()
+    ages[::7] = rng.uniform(0, 60, len(ages[::7])).tolist()
+
+    batch = Herbivore.fitness_batch(np.array(ages), weights).tolist()
+    in_groups = []
+    for start in range(0, len(ages), 20):
+        in_groups += Herbivore.fitness_list(ages[start:start + 20], weights[start:start + 20])
+
+    assert in_groups == batch
+
+
+def test_weight_factor_of_single_weight():
+    """
+    Test that the weight factor of a single weight times the age factor is exactly the batch
+    fitness.
+    """
+    weights = np.array([3.2, 10.0, 25.5, 60.0])
+
+    batch = Carnivore.fitness_batch(np.full(4, 7), weights)
+    single = [float(Carnivore.age_factor(7)) * float(Carnivore.weight_factor(weight))
+              for weight in weights.tolist()]
+
+    assert list(batch) == single
+
+
+def test_fitness_batch_old_animal():
+    """Test that a very old animal gets a fitness close to zero without overflow."""
+    assert Herbivore.fitness_batch([5000], [20.0])[0] == 0
+
+
+def test_age_table_equals_formula():
+    """Test that the age factor from the table is exactly the age factor from the formula."""
+    ages = np.arange(0, 5000)
+
+    from_table = Carnivore.age_factor(ages)
+    from_formula = Carnivore.age_factor(ages.astype(float))
+
+    assert np.array_equal(from_table, from_formula)
+    assert from_table[-1] == 0
+
+
+def test_age_table_is_capped():
+    """
+    Test that a slowly falling age factor gets a table of limited size, and that ages past the
+    end of the table are calculated with the formula.
+    """
+    Carnivore.set_parameters_animals({"phi_age": 1e-5})
+    try:
+        compiled = Carnivore.compiled_parameters()
+        size = compiled.age_table_size
+        ages = [0, size - 1, size, 10 * size]
+
+        assert len(compiled.age_table) == len(compiled.age_values) == size
+        assert list(Carnivore.age_factor(np.array(ages))) == list(
+            Carnivore.age_factor(np.array(ages, dtype=float)))
+        assert Carnivore.fitness_list(ages, [20.0] * 4) == Carnivore.fitness_batch(
+            ages, [20.0] * 4).tolist()
+    finally:
+        Carnivore.set_parameters_animals({"phi_age": 0.3})
+
+
+def test_age_table_rebuilt_with_new_parameters():
+    """Test that the table is rebuilt when a_half or phi_age is set."""
+    before = Herbivore.age_factor(np.array([40]))[0]
+
+    Herbivore.set_parameters_animals({"a_half": 20.0})
+    try:
+        compiled = Herbivore.compiled_parameters()
+        assert compiled.a_half == 20.0
+        assert compiled.age_table[20] == 0.5
+        assert Herbivore.age_factor(np.array([40]))[0] < before
+    finally:
+        Herbivore.set_parameters_animals({"a_half": 40.0})
+
+
+def test_fitness_calculated_when_read():
+    """
+    Test that the fitness is only calculated when it is read, and calculated again after the
+    weight has changed.
+    """
+    herbivore = Herbivore(10, 20)
+    assert herbivore._fitness is None
+
+    fitness = herbivore.fitness
+    assert herbivore._fitness == fitness
+
+    herbivore.weight_decrease()
+    assert herbivore._fitness is None
+    assert herbivore.fitness < fitness
+
+
+def test_fitness_out_of_date_after_new_parameters():
+    """Test that setting new parameters makes the cached fitness out of date."""
+    herbivore = Herbivore(10, 20)
+    fitness = herbivore.fitness
+
+    Herbivore.set_parameters_animals({"w_half": 30.0})
+    try:
+        assert herbivore.fitness < fitness
+    finally:
+        Herbivore.set_parameters_animals({"w_half": 10.0})
+    assert herbivore.fitness == fitness
+
+
 def test_death_herbivores_certain():
     """
     Test death when herbivore weight is zero.
@@ -112,9 +249,9 @@ def test_death_herbivores_bychance(mocker):
     """
     Test the chance of death, using mocker.
     """
-    mocker.patch("random.random", return_value=0)
+    rng = mocker.Mock(**{"random.return_value": 0})
     herbivores = Herbivore(10, 20)
-    herbivores.death_animal()
+    herbivores.death_animal(rng)
 
     assert herbivores.death == True
 
@@ -123,10 +260,10 @@ def test_birth_herb(mocker):
     """
     Test the probability of birth.
     """
-    mocker.patch("random.random", return_value=2)
+    rng = mocker.Mock(**{"random.return_value": 2})
     herbivore = Herbivore(3, 14)
     n_animals_in_same_species = 5
-    birth_herb = herbivore.birth(n_animals_in_same_species)
+    birth_herb = herbivore.birth(n_animals_in_same_species, rng)
 
     assert birth_herb is None
 
@@ -135,10 +272,10 @@ def test_birth_carni(mocker):
     """
     Test the probability of birth.
     """
-    mocker.patch("random.random", return_value=2)
+    rng = mocker.Mock(**{"random.return_value": 2})
     carnivore = Carnivore(3, 14)
     n_animals_in_same_species = 5
-    birth_carni = carnivore.birth(n_animals_in_same_species)
+    birth_carni = carnivore.birth(n_animals_in_same_species, rng)
     assert birth_carni is None
 
 
@@ -146,10 +283,10 @@ def test_certain_birth(mocker):
     """
     Test the birth function when there is only one carnivore in the cell.
     """
-    mocker.patch("random.random", return_value=0)
+    rng = mocker.Mock(**{"random.return_value": 0})
     carnivore = Carnivore(3, 14)
     n_animals_in_same_species = 5
-    birth_carni = carnivore.birth(n_animals_in_same_species)
+    birth_carni = carnivore.birth(n_animals_in_same_species, rng)
 
     assert birth_carni is None
 
@@ -223,6 +360,6 @@ def test_carnivore_kill_probability(mocker):
 
 
 def test_migration(mocker):
-    mocker.patch("random.random", return_value=0)
+    rng = mocker.Mock(**{"random.return_value": 0})
     animal = Animal()
-    assert animal.migration_probability()
+    assert animal.migration_probability(rng)
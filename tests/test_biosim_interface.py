@@ -21,6 +21,8 @@ import pytest
 import glob
 import os
 import os.path
+import subprocess
+import sys
 import matplotlib.pyplot as plt
 
 from src.biosim.simulation import BioSim
@@ -229,6 +231,22 @@ def test_get_animals_per_species(plain_sim):
     assert plain_sim.num_animals_per_species == {'Herbivore': 0, 'Carnivore': 0}
 
 
+def test_animals_per_species_counts_cells(plain_sim):
+    """Test that the species counters equal the animals in the cells after some years"""
+
+    plain_sim.add_population([{'loc': (2, 2),
+                               'pop': [{'species': 'Herbivore', 'age': 5, 'weight': 20.}
+                                       for _ in range(30)]
+                               + [{'species': 'Carnivore', 'age': 5, 'weight': 20.}
+                                  for _ in range(5)]}])
+    plain_sim.simulate(num_years=3)
+
+    cells = plain_sim.island.map.values()
+    assert plain_sim.num_animals_per_species == {
+        'Herbivore': sum(len(cell.herbivore_population) for cell in cells),
+        'Carnivore': sum(len(cell.carnivore_population) for cell in cells)}
+
+
 def test_set_plot_limits():
     """Test that y-axis and color limits for plots can be set."""
     BioSim(island_map='W', ini_pop=[], seed=1, ymax_animals=20,
@@ -246,6 +264,21 @@ def test_configure_histograms(prop, config):
            hist_specs={prop: config})
 
 
+def test_headless_without_matplotlib():
+    """Test that a simulation without graphics never imports matplotlib"""
+    code = ("import sys\n"
+            "from biosim.simulation import BioSim\n"
+            "sim = BioSim(island_map='WWW\\nWLW\\nWWW', seed=1, vis_years=0,\n"
+            "             ini_pop=[{'loc': (2, 2), 'pop': [{'species': 'Herbivore',\n"
+            "                                               'age': 5, 'weight': 20}]}])\n"
+            "sim.simulate(3)\n"
+            "assert sim.visualization is None\n"
+            "assert 'matplotlib' not in sys.modules\n")
+    source = os.path.join(os.path.dirname(__file__), os.pardir, 'src')
+    env = dict(os.environ, PYTHONPATH=os.path.abspath(source))
+    subprocess.run([sys.executable, "-c", code], env=env, check=True)
+
+
 @pytest.fixture
 def figfile_base():
     """Provide name for figfile base and delete figfiles after test completes"""
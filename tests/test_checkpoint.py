@@ -0,0 +1,134 @@
+# -*- encoding: utf-8 -*-
+"""
+This is the test function for saving and resuming a simulation.
+"""
+
+__author__ = "Sathuriyan Sivathas & Lavanyan Rathy"
+__email__ = "sathuriyan.sivathas@nmbu.no & lavanyan.rathy@nmbu.no"
+
+import numpy as np
+import pytest
+
+from src.biosim.log import read_log
+from src.biosim.simulation import BioSim
+
+island_map = "WWWWWW\nWLLHLW\nWLDLLW\nWHLLDW\nWWWWWW"
+ini_pop = [{"loc": (2, 2), "pop": [{"species": "Herbivore", "age": 5, "weight": 20}
+                                   for _ in range(50)]},
+           {"loc": (3, 3), "pop": [{"species": "Carnivore", "age": 5, "weight": 20}
+                                   for _ in range(10)]}]
+
+
+def island_state(sim):
+    """The animals of every cell and the counts of the island."""
+    state = [sim.year, sim.num_animals_per_species, sorted(sim.island.active_cells)]
+    for snapshot in (sim.island.herbivore_snapshot(), sim.island.carnivore_snapshot()):
+        state += [snapshot.age.tolist(), snapshot.weight.tolist(), snapshot.cell.tolist()]
+    return state
+
+
+def test_resume_is_identical(tmp_path):
+    """Test that a resumed simulation gives the same animals as one that was not stopped."""
+    checkpoint = str(tmp_path / "biosim.ckpt")
+    sim = BioSim(island_map, ini_pop, seed=7, vis_years=0)
+    sim.simulate(15)
+    sim.save_checkpoint(checkpoint)
+    saved = island_state(sim)
+    sim.simulate(15)
+
+    resumed = BioSim.load_checkpoint(checkpoint, vis_years=0)
+    assert island_state(resumed) == saved
+    resumed.simulate(15)
+    assert island_state(resumed) == island_state(sim)
+    assert (resumed.island.matrix_herbivores() == sim.island.matrix_herbivores()).all()
+
+
+def test_resume_then_add_population(tmp_path):
+    """
+    Test that animals without a weight, added after resuming, get the same weights as in a
+    simulation that was not stopped.
+    """
+    checkpoint = str(tmp_path / "biosim.ckpt")
+    new_animals = [{"loc": (2, 3), "pop": [{"species": "Herbivore", "age": None, "weight": None}
+                                           for _ in range(20)]}]
+    sim = BioSim(island_map, ini_pop, seed=7, vis_years=0)
+    sim.simulate(5)
+    sim.save_checkpoint(checkpoint)
+    sim.add_population(new_animals)
+    sim.simulate(5)
+
+    resumed = BioSim.load_checkpoint(checkpoint, vis_years=0)
+    resumed.add_population(new_animals)
+    resumed.simulate(5)
+    assert island_state(resumed) == island_state(sim)
+
+
+def test_resume_appends_to_log(tmp_path):
+    """Test that a resumed simulation adds its records to the log file instead of emptying it."""
+    checkpoint = str(tmp_path / "biosim.ckpt")
+    log_file = str(tmp_path / "biosim.log")
+    sim = BioSim(island_map, ini_pop, seed=7, vis_years=0, log_file=log_file)
+    sim.simulate(4)
+    sim.save_checkpoint(checkpoint)
+
+    resumed = BioSim.load_checkpoint(checkpoint, vis_years=0, log_file=log_file)
+    resumed.simulate(3)
+    assert list(read_log(log_file)["year"]) == list(range(1, 8))
+
+
+def test_checkpoint_restores_parameters(tmp_path):
+    """Test that the parameters of the species and landscapes are set from the checkpoint."""
+    checkpoint = str(tmp_path / "biosim.ckpt")
+    herbivore = BioSim.animal_species["Herbivore"]
+    lowland = BioSim.landscape_types["L"]
+    herbivore_parameters = dict(herbivore.parameters_animal)
+    lowland_parameters = dict(lowland.parameters_fodder)
+    try:
+        BioSim.set_animal_parameters("Herbivore", {"F": 20.0})
+        BioSim.set_landscape_parameters("L", {"f_max": 600})
+        BioSim(island_map, ini_pop, seed=7, vis_years=0).save_checkpoint(checkpoint)
+
+        BioSim.set_animal_parameters("Herbivore", {"F": 10.0})
+        BioSim.set_landscape_parameters("L", {"f_max": 800})
+        BioSim.load_checkpoint(checkpoint, vis_years=0)
+        assert herbivore.parameters_animal["F"] == 20.0
+        assert lowland.parameters_fodder["f_max"] == 600
+    finally:
+        herbivore.parameters_animal.update(herbivore_parameters)
+        herbivore.compile_parameters()
+        lowland.parameters_fodder.update(lowland_parameters)
+        lowland.compile_parameters()
+
+
+@pytest.mark.parametrize("seed", [np.int64(7), np.random.SeedSequence([7, np.uint32(8)])])
+def test_checkpoint_of_numpy_seed(tmp_path, seed):
+    """Test that a simulation seeded with NumPy numbers can be saved and resumed."""
+    checkpoint = str(tmp_path / "biosim.ckpt")
+    sim = BioSim(island_map, ini_pop, seed=seed, vis_years=0)
+    sim.simulate(3)
+    sim.save_checkpoint(checkpoint)
+    sim.simulate(3)
+
+    resumed = BioSim.load_checkpoint(checkpoint, vis_years=0)
+    resumed.simulate(3)
+    assert island_state(resumed) == island_state(sim)
+
+
+def test_checkpoint_of_empty_island(tmp_path):
+    """Test that an island without animals can be saved and resumed."""
+    checkpoint = str(tmp_path / "biosim.ckpt")
+    BioSim(island_map, [], seed=1, vis_years=0).save_checkpoint(checkpoint)
+
+    resumed = BioSim.load_checkpoint(checkpoint, vis_years=0)
+    assert resumed.num_animals == 0
+    assert not resumed.island.active_cells
+
+
+def test_checkpoint_version(tmp_path):
+    """Test that a checkpoint of another version is refused."""
+    checkpoint = str(tmp_path / "biosim.ckpt")
+    with open(checkpoint, "wb") as checkpoint_file:
+        np.savez(checkpoint_file, header=np.frombuffer(b'{"version": 0}', dtype=np.uint8))
+
+    with pytest.raises(ValueError):
+        BioSim.load_checkpoint(checkpoint)
@@ -0,0 +1,63 @@
+# -*- encoding: utf-8 -*-
+"""
+This is the test function for the parallel runs of many seeds.
+"""
+
+__author__ = "Sathuriyan Sivathas & Lavanyan Rathy"
+__email__ = "sathuriyan.sivathas@nmbu.no & lavanyan.rathy@nmbu.no"
+
+import pytest
+
+from src.biosim.ensemble import run_ensemble, scenario_parameters, simulate_counts
+from src.biosim.simulation import BioSim
+
+island_map = "WWWWW\nWLLHW\nWDLLW\nWWWWW"
+ini_pop = [{"loc": (2, 2), "pop": [{"species": "Herbivore", "age": 5, "weight": 20}
+                                   for _ in range(30)]},
+           {"loc": (3, 3), "pop": [{"species": "Carnivore", "age": 5, "weight": 20}
+                                   for _ in range(5)]}]
+
+
+def test_counts_of_one_simulation():
+    """Test that the counts follow the simulation year by year."""
+    counts = simulate_counts(island_map, ini_pop, 4, 5)
+    sim = BioSim(island_map, ini_pop, seed=4, vis_years=0)
+    sim.simulate(5)
+
+    assert counts.shape == (6, 2)
+    assert list(counts[0]) == [30, 5]
+    assert list(counts[-1]) == [sim.num_animals_per_species["Herbivore"],
+                                sim.num_animals_per_species["Carnivore"]]
+
+
+def test_ensemble_independent_of_workers():
+    """Test that every seed gives the same counts, whatever the number of workers."""
+    seeds = [1, 2, 3, 4, 5]
+    serial = run_ensemble(island_map, ini_pop, seeds, 6, processes=1)
+    parallel = run_ensemble(island_map, ini_pop, seeds, 6, processes=2)
+
+    assert serial.shape == (5, 7, 2)
+    assert (serial == parallel).all()
+    assert (serial[2] == simulate_counts(island_map, ini_pop, 3, 6)).all()
+
+
+def test_ensemble_parameters():
+    """Test that the ensemble uses its parameters and leaves the ones of the process alone."""
+    before = BioSim.parameter_state()
+    counts = run_ensemble(island_map, ini_pop, [1], 3, processes=1,
+                          species_parameters={"Herbivore": {"F": 0.001}},
+                          landscape_parameters={"L": {"f_max": 0.001}})
+
+    assert BioSim.parameter_state() == before
+    assert not (counts == run_ensemble(island_map, ini_pop, [1], 3, processes=1)).all()
+
+
+def test_scenario_parameters_checked():
+    """Test that changes to the parameters are checked."""
+    with pytest.raises(ValueError):
+        scenario_parameters(species_parameters={"Herbivore": {"not_a_parameter": 1}})
+
+
+def test_empty_ensemble():
+    """Test that an ensemble without seeds gives an empty array."""
+    assert run_ensemble(island_map, ini_pop, [], 4).shape == (0, 5, 2)
@@ -1,6 +1,7 @@
 __author__ = "Sathuriyan Sivathas & Lavanyan Rathy"
 __email__ = "sathuriyan.sivathas@nmbu.no & lavanyan.rathy@nmbu.no"
 
+import numpy as np
 import pytest
 
 from src.biosim.island import Island
@@ -137,3 +138,296 @@ def test_matrix_carnivores():
     matrix = island.matrix_carnivores()
     print(matrix)
     assert matrix[1][1] == 1
+
+
+def test_tile_rng_keyed_by_tile_and_year():
+    """Test that the stream of a tile only depends on the seed, tile, year and placement."""
+    island = Island(seed=12345)
+
+    first = island.tile_rng(2, 3).random(5)
+    assert (Island(seed=12345).tile_rng(2, 3).random(5) == first).all()
+    assert (island.tile_rng(2, 4).random(5) != first).all()
+    assert (island.tile_rng(3, 3).random(5) != first).all()
+    assert (island.tile_rng(2, 3, placement=1).random(5) != first).all()
+
+
+def test_cells_of_a_tile_share_a_stream():
+    """Test that the cells of a tile share the generator of the year, and other tiles do not."""
+    geogr = "\n".join(["W" * 20] + ["W" + "L" * 18 + "W"] * 18 + ["W" * 20])
+    island = Island(map_of_island=geogr, seed=5)
+    island.population_cell([{'loc': loc, 'pop': [{'species': 'Herbivore', 'age': 5,
+                                                  'weight': 20}]}
+                            for loc in ((2, 2), (2, 3), (2, 19))])
+    island.annual_cycle()
+
+    first, second, other = (island.map[loc].rng for loc in ((2, 2), (2, 3), (2, 19)))
+    assert first is second
+    assert other is not first
+
+
+def test_same_seed_same_result():
+    """Test that two islands with the same seed give the same animals, cell by cell."""
+    geogr = """\
+            WWWWW
+            WLLHW
+            WWWWW"""
+    population = [{'loc': (2, 2),
+                   'pop': [{'species': 'Herbivore', 'age': 5, 'weight': 20}
+                           for _ in range(50)]}]
+
+    islands = [Island(map_of_island=geogr, seed=4) for _ in range(2)]
+    for island in islands:
+        island.population_cell(population)
+        for _ in range(5):
+            island.annual_cycle()
+
+    for loc, cell in islands[0].map.items():
+        other = islands[1].map[loc].herbivore_population
+        assert list(cell.herbivore_population.weight) == list(other.weight)
+
+
+def test_cycle_independent_of_cell_order():
+    """
+    Test that the order the cells got their animals in, and the order of the active cells, do
+    not change the animals of any cell over several years.
+    """
+    geogr = """\
+            WWWWWW
+            WLLHLW
+            WDLLHW
+            WLLDLW
+            WWWWWW"""
+    population = [{'loc': loc,
+                   'pop': [{'species': 'Herbivore', 'age': 5, 'weight': 20}
+                           for _ in range(30)]
+                   + [{'species': 'Carnivore', 'age': 5, 'weight': 20} for _ in range(3)]}
+                  for loc in ((2, 2), (3, 3), (4, 5), (2, 5))]
+
+    islands = [Island(map_of_island=geogr, seed=7) for _ in range(2)]
+    islands[0].population_cell(population)
+    islands[1].population_cell(population[::-1])
+    assert list(islands[0].active_cells) != list(islands[1].active_cells)
+    shuffle_rng = np.random.default_rng(1)
+    for _ in range(6):
+        islands[0].annual_cycle()
+        active = list(islands[1].active_cells.items())
+        islands[1].active_cells = dict(active[i] for i in shuffle_rng.permutation(len(active)))
+        islands[1].annual_cycle()
+
+    assert len(islands[0].active_cells) > 4
+    assert (islands[0].matrix_herbivores() == islands[1].matrix_herbivores()).all()
+    assert (islands[0].matrix_carnivores() == islands[1].matrix_carnivores()).all()
+    assert sorted(islands[0].map) == sorted(islands[1].map)
+    for loc, cell in islands[0].map.items():
+        other = islands[1].map[loc]
+        for species_population in ("herbivore_population", "carnivore_population"):
+            population = getattr(cell, species_population)
+            other_population = getattr(other, species_population)
+            assert list(population.age) == list(other_population.age)
+            assert list(population.weight) == list(other_population.weight)
+            assert list(population.fitness) == list(other_population.fitness)
+
+
+def test_reset_island_is_new():
+    """Test that a reset island gives the same animals as a new island with the same seed."""
+    geogr = """\
+            WWWWW
+            WLLHW
+            WDLLW
+            WWWWW"""
+    population = [{'loc': (2, 3),
+                   'pop': [{'species': 'Herbivore', 'age': 5, 'weight': None}
+                           for _ in range(30)]
+                   + [{'species': 'Carnivore', 'age': 5, 'weight': 20} for _ in range(3)]}]
+
+    islands = [Island(map_of_island=geogr, seed=2), Island(map_of_island=geogr, seed=9)]
+    islands[1].population_cell(population)
+    for _ in range(3):
+        islands[1].annual_cycle()
+    islands[1].reset(2)
+    for island in islands:
+        island.population_cell(population)
+        for _ in range(3):
+            island.annual_cycle()
+
+    assert islands[1].year == 3
+    assert (islands[0].matrix_herbivores() == islands[1].matrix_herbivores()).all()
+    for loc, cell in islands[0].map.items():
+        other = islands[1].map[loc]
+        assert list(cell.herbivore_population.weight) == list(other.herbivore_population.weight)
+
+
+def test_active_cells():
+    """
+    Test that only land cells with animals are active, that migrants make their new cell active,
+    and that a cell stops being active when its animals are gone.
+    """
+    geogr = """\
+            WWWWW
+            WLLLW
+            WWWWW"""
+    island = Island(map_of_island=geogr, seed=3)
+    island.population_cell([{'loc': (2, 2),
+                             'pop': [{'species': 'Herbivore', 'age': 5, 'weight': 50}
+                                     for _ in range(100)]}])
+    assert [island.location(index) for index in island.active_cells] == [(2, 2)]
+
+    island.annual_cycle()
+    assert (2, 3) in [island.location(index) for index in island.active_cells]
+
+    for cell in island.active_cells.values():
+        cell.herbivore_population.clear()
+    island.annual_cycle()
+    assert not island.active_cells
+
+
+def test_active_cells_stay_in_order():
+    """Test that cells made active by migrants are run in the order of their flat index."""
+    geogr = """\
+            WWWWW
+            WLLLW
+            WWWWW"""
+    island = Island(map_of_island=geogr, seed=3)
+    island.population_cell([{'loc': (2, 3),
+                             'pop': [{'species': 'Herbivore', 'age': 5, 'weight': 50}
+                                     for _ in range(100)]}])
+    island.annual_cycle()
+
+    assert len(island.active_cells) == 3
+    assert list(island.active_cells) == [0, 1, 2]
+
+
+def test_topology():
+    """Test the flat index of the land cells and their land neighbors in CSR form."""
+    geogr = """\
+            WWWW
+            WLHW
+            WWDW
+            WWWW"""
+    island = Island(map_of_island=geogr)
+
+    assert island.terrain.tolist() == [[0, 0, 0, 0], [0, 1, 2, 0], [0, 0, 3, 0], [0, 0, 0, 0]]
+    assert island.locations.tolist() == [[2, 2], [2, 3], [3, 3]]
+    assert island.cell_index[1, 2] == 1 and island.cell_index[0, 0] == -1
+    assert island.neighbor_offsets.tolist() == [0, 1, 3, 4]
+    assert island.neighbor_indices.tolist() == [1, 0, 2, 1]
+    assert island.neighbor_counts.tolist() == [4, 4, 4]
+    assert island.cells == [None, None, None]
+    assert island.connect(1).neighbors == [island.cells[0], island.cells[2]]
+
+
+def test_map_right_boundary():
+    """Test that a map with land in the last column is rejected."""
+    geogr = """\
+            WWW
+            WLL
+            WWW"""
+
+    with pytest.raises(ValueError):
+        Island(map_of_island=geogr)
+
+
+def test_only_land_cells():
+    """Test that animals can not be put in water or outside the map."""
+    geogr = """\
+            WWWW
+            WLDW
+            WWWW"""
+    island = Island(map_of_island=geogr)
+
+    with pytest.raises(ValueError):
+        island.population_cell([{'loc': (3, 5),
+                                 'pop': [{'species': 'Herbivore', 'age': 10, 'weight': 12.5}]}])
+    with pytest.raises(ValueError):
+        island.population_cell([{'loc': (1, 1),
+                                 'pop': [{'species': 'Herbivore', 'age': 10, 'weight': 12.5}]}])
+
+
+def test_cells_made_when_needed():
+    """
+    Test that a land cell only gets a cell object when animals are placed in it or next to it,
+    and that the fodder of the other land cells is kept in an array.
+    """
+    geogr = """\
+            WWWWWW
+            WLLWHW
+            WWWWWW"""
+    island = Island(map_of_island=geogr)
+    assert not island.map
+    f_max = {letter: landscape.compiled_parameters().f_max
+             for letter, landscape in Island.landscape_types.items()}
+    assert island.fodder.tolist() == [f_max["L"], f_max["L"], f_max["H"]]
+
+    island.population_cell([{'loc': (2, 2),
+                             'pop': [{'species': 'Herbivore', 'age': 10, 'weight': 12.5}]}])
+    assert sorted(island.map) == [(2, 2), (2, 3)]
+    assert island.cells[2] is None
+
+
+def test_parse_terrain():
+    """Test that the letters are turned into terrain codes, and unknown letters are marked."""
+    terrain = Island.parse_terrain(["WLH", "DWQ"])
+
+    assert terrain.tolist() == [[0, 1, 2], [3, 0, Island.invalid_code]]
+
+
+def test_count_matrices_follow_populations():
+    """Test that the count matrices are kept equal to the sizes of the populations."""
+    geogr = """\
+            WWWWW
+            WLLHW
+            WDLLW
+            WWWWW"""
+    island = Island(map_of_island=geogr, seed=11)
+    island.population_cell([{'loc': (2, 3),
+                             'pop': [{'species': 'Herbivore', 'age': 5, 'weight': 20}
+                                     for _ in range(50)]
+                             + [{'species': 'Carnivore', 'age': 5, 'weight': 20}
+                                for _ in range(5)]}])
+    for _ in range(4):
+        island.annual_cycle()
+
+    herbivores = island.matrix_herbivores()
+    carnivores = island.matrix_carnivores()
+    for (row, column), cell in island.map.items():
+        assert herbivores[row - 1, column - 1] == len(cell.herbivore_population)
+        assert carnivores[row - 1, column - 1] == len(cell.carnivore_population)
+    assert island.herbivore_counter.total == herbivores.sum()
+    with pytest.raises(ValueError):
+        herbivores[1, 1] = 0
+
+
+def test_population_snapshot():
+    """Test that the snapshot has the age, weight, fitness and cell of every animal."""
+    geogr = """\
+            WWWW
+            WLHW
+            WWWW"""
+    island = Island(map_of_island=geogr)
+    island.population_cell([{'loc': (2, 2),
+                             'pop': [{'species': 'Herbivore', 'age': 3, 'weight': 12.5}]},
+                            {'loc': (2, 3),
+                             'pop': [{'species': 'Herbivore', 'age': 7, 'weight': 20.0},
+                                     {'species': 'Herbivore', 'age': 1, 'weight': 8.0}]}])
+
+    snapshot = island.herbivore_snapshot()
+    herbivores = island.get_all_herbivores()
+
+    assert len(snapshot) == 3
+    assert sorted(snapshot.age.tolist()) == sorted(animal.age for animal in herbivores)
+    assert sorted(snapshot.fitness.tolist()) == sorted(animal.fitness for animal in herbivores)
+    assert sorted(snapshot.cell.tolist()) == [0, 1, 1]
+    assert len(island.carnivore_snapshot()) == 0
+
+
+def test_population_snapshot_one_cell_is_view():
+    """Test that the snapshot of a single cell is a read-only view of its population."""
+    island = Island()
+    island.population_cell([{'loc': (2, 2),
+                             'pop': [{'species': 'Carnivore', 'age': 3, 'weight': 12.5}]}])
+
+    snapshot = island.carnivore_snapshot()
+
+    assert snapshot.weight.base is not None
+    with pytest.raises(ValueError):
+        snapshot.weight[0] = 1.0
@@ -10,13 +10,23 @@ This script purpose is to test the functions from landscape.py file.
 __author__ = "Sathuriyan Sivathas & Lavanyan Rathy"
 __email__ = "sathuriyan.sivathas@nmbu.no & lavanyan.rathy@nmbu.no"
 
-import random
-
+import numpy as np
 import pytest
 
 from src.biosim.landscape import Lowland, Water, Highland
 
 
+def fixed_uniform_rng(mocker, value):
+    """
+    Random number generator where every uniform number is the given value, while the other
+    distributions are drawn from a seeded generator.
+    """
+    rng = mocker.Mock(wraps=np.random.default_rng(12345))
+    rng.random.side_effect = lambda size=None: (float(value) if size is None
+                                                else np.full(size, value, dtype=float))
+    return rng
+
+
 def test_disp_population_herbivores():
     """
     This test will check if the function append the right
@@ -49,6 +59,23 @@ def test_disp_population_carnivores():
     assert check == 3
 
 
+def test_population_update_without_age():
+    """Test that an animal without an age is a newborn, like an Animal made without age"""
+    land = Lowland()
+    land.population_update([{'species': 'Herbivore', 'age': None, 'weight': 12.5}])
+
+    assert land.herbivores[0].age == 0
+
+
+def test_animal_views_can_not_be_added():
+    """Test that the views of the animals can not be mistaken for the population"""
+    land = Lowland()
+    land.population_update([{'species': 'Carnivore', 'age': 3, 'weight': 7.3}])
+
+    with pytest.raises(AttributeError):
+        land.carnivores.append(land.carnivores[0])
+
+
 def test_new_fodder():
     """
     Checks if the fodder grows/updates every new year
@@ -195,6 +222,24 @@ def test_eat_fodder2():
     land.population_update(population)
     land.new_fodder()
 
+def test_eat_fodder_fittest_first():
+    """Test that the fittest herbivores eat first when there is not enough fodder for all."""
+    population = [{'species': 'Herbivore', 'age': 5, 'weight': 10},
+                  {'species': 'Herbivore', 'age': 5, 'weight': 30},
+                  {'species': 'Herbivore', 'age': 5, 'weight': 20}]
+    land = Lowland()
+    land.population_update(population)
+    appetite = land.herbivore_population.species.compiled_parameters().F
+    beta = land.herbivore_population.species.compiled_parameters().beta
+    land.fodder = 1.5 * appetite
+
+    land.eat_fodder()
+
+    assert land.fodder == 0
+    assert list(land.herbivore_population.weight) == [10, 30 + beta * appetite,
+                                                      20 + beta * 0.5 * appetite]
+
+
 def test_eat_fodder_not_eat():
     """
     Here I test if the Herbivores do not eat by placing 0 fodder on the landscape,
@@ -234,6 +279,21 @@ def test_death_population():
     assert len(after_population) < 3
 
 
+def test_death_population_only_weightless(mocker):
+    """Test that only the animal with zero weight dies when no uniform number is small enough."""
+    pop = [{'species': 'Herbivore', 'age': 10, 'weight': 12.5},
+           {'species': 'Herbivore', 'age': 9, 'weight': 10.3},
+           {'species': 'Herbivore', 'age': 5, 'weight': 8.1}]
+
+    land = Highland(rng=fixed_uniform_rng(mocker, 1))
+    land.population_update(pop)
+    land.herbivore_population.weight[1] = 0
+
+    land.death_population()
+
+    assert list(land.herbivore_population.age) == [10, 5]
+
+
 def test_prey():
     """
     We should test if the list gets shuffled or not here too.
@@ -246,7 +306,7 @@ def test_prey():
            {'species': 'Carnivore', 'age': 3, 'weight': 7.3},
            {'species': 'Carnivore', 'age': 5, 'weight': 8.1}]
 
-    land = Lowland()
+    land = Lowland(rng=np.random.default_rng(1))
     land.population_update(pop)
 
     before_population = land.herbivores
@@ -258,25 +318,170 @@ def test_prey():
     assert len(before_population) != len(after_population)
 
 
+def test_unseeded_cell_follows_numpy_seed():
+    """Test that a cell without a generator is reproducible when NumPy is seeded."""
+    np.random.seed(12345)
+    first = Lowland().rng.random(3)
+    np.random.seed(12345)
+    assert (Lowland().rng.random(3) == first).all()
+
+
 def test_prey_randomized():
-    """Test to see if the list gets randomized"""
-    random.seed(123456)
+    """Test that the carnivores hunt in a random order"""
     carni = [{'species': 'Carnivore', 'age': 10, 'weight': 12.5},
              {'species': 'Carnivore', 'age': 3, 'weight': 7.3},
              {'species': 'Carnivore', 'age': 5, 'weight': 8.1},
-             {'species': 'Carnivore', 'age': 5, 'weight': 10.1},
+             {'species': 'Carnivore', 'age': 6, 'weight': 10.1},
              {'species': 'Carnivore', 'age': 15, 'weight': 12.1},
              {'species': 'Carnivore', 'age': 22, 'weight': 11.1}]
+    herbi = [{'species': 'Herbivore', 'age': 5, 'weight': 20} for _ in range(10)]
+    land = Lowland(rng=np.random.default_rng(123456))
+    land.population_update(carni + herbi)
+
+    ages_before = [carnivore.age for carnivore in land.carnivores]
+
+    land.prey()
+
+    ages_after = [carnivore.age for carnivore in land.carnivores]
+
+    assert sorted(ages_after) == sorted(ages_before)
+    assert ages_after != ages_before
+
+
+@pytest.mark.parametrize("count", [10, 300])
+def test_eat_fodder_equal_fitness_in_order(count):
+    """
+    Test that of herbivores with the same fitness the first ones eat, for a small population
+    and for one that is worked on with arrays.
+    """
     land = Lowland()
-    land.population_update(carni)
+    land.herbivore_population.extend([5] * count, [20.0] * count)
+    appetite = land.herbivore_population.species.compiled_parameters().F
+    land.fodder = 2.5 * appetite
+
+    land.eat_fodder()
+
+    weight = land.herbivore_population.weight
+    assert weight[0] == weight[1] > weight[2] > weight[3] == weight[-1] == 20.0
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_small_population_matches_arrays(monkeypatch, seed):
+    """
+    Test that a small population, which is worked on with plain Python numbers, goes through
+    the year exactly like a population that is worked on with arrays, using the same random
+    numbers. Some herbivores are alike, so the fodder runs out among animals of equal fitness.
+    """
+    weights = np.random.default_rng(seed).uniform(5, 40, 12).tolist()
+    population = ([{'species': 'Herbivore', 'age': age, 'weight': weight}
+                   for age, weight in enumerate(weights)]
+                  + [{'species': 'Herbivore', 'age': 5, 'weight': 20.0} for _ in range(6)]
+                  + [{'species': 'Carnivore', 'age': age, 'weight': 30 - age}
+                     for age in range(1, 4)])
+    population_class = type(Lowland().herbivore_population)
+    cells = []
+    for scalar_size in (population_class.scalar_size, 0):
+        monkeypatch.setattr(population_class, "scalar_size", scalar_size)
+        land = Lowland(rng=np.random.default_rng(seed))
+        land.fodder = 45
+        land.neighbors = [Highland(), Water(), Lowland()]
+        land.population_update(population)
+        for method in ("eat_fodder", "prey", "newborn_herbivore", "newborn_carnivore",
+                       "migrated_animals", "aging_population", "weight_loss",
+                       "death_population"):
+            getattr(land, method)()
+        cells.append(land)
+
+    small, arrays = cells
+    assert small.fodder == arrays.fodder
+    for small_cell, array_cell in zip([small, *small.neighbors], [arrays, *arrays.neighbors]):
+        small_cell.merge_arrivals()
+        array_cell.merge_arrivals()
+        for species_population in ("herbivore_population", "carnivore_population"):
+            small_population = getattr(small_cell, species_population)
+            array_population = getattr(array_cell, species_population)
+            assert list(small_population.age) == list(array_population.age)
+            assert list(small_population.weight) == list(array_population.weight)
+            assert list(small_population.fitness) == list(array_population.fitness)
+
+
+def hunting_cell(rng, carnivore_fitness, herbivore_fitness):
+    """Lowland with one carnivore and herbivores with the given fitness."""
+    land = Lowland(rng=rng)
+    land.carnivore_population.extend([5], [20.0])
+    land.carnivore_population.fitness = [carnivore_fitness]
+    land.herbivore_population.extend(np.full(len(herbivore_fitness), 5), np.full(
+        len(herbivore_fitness), 20.0))
+    land.herbivore_population.fitness = herbivore_fitness
+    return land
+
+
+def test_prey_never_kills_fitter(mocker):
+    """Test that a herbivore that is fitter than the carnivore is never killed."""
+    land = hunting_cell(fixed_uniform_rng(mocker, 0), 0.5, [0.9, 0.6])
+
+    land.prey()
+
+    assert len(land.herbivore_population) == 2
+
+
+def test_prey_kills_weakest_first(mocker):
+    """Test that a carnivore tries the weakest herbivores first, and stops when it is full."""
+    land = hunting_cell(fixed_uniform_rng(mocker, 0), 0.95, [0.4, 0.1, 0.3])
+    appetite = land.carnivore_population.species.compiled_parameters().F
+    land.herbivore_population.weight = 0.6 * appetite
+    land.herbivore_population.fitness = [0.4, 0.1, 0.3]
 
-    population_list_before = land.carnivores
+    land.prey()
+
+    assert list(land.herbivore_population.fitness) == [0.4]
+
+
+def test_prey_carnivore_fitness(mocker):
+    """Test that a carnivore that has eaten gets the fitness of its new weight."""
+    land = hunting_cell(fixed_uniform_rng(mocker, 0), 0.95, [0.1, 0.2])
+    carnivores = land.carnivore_population
 
     land.prey()
 
-    population_list_after = land.carnivores
+    species = carnivores.species
+    expected = species.fitness_batch(carnivores.age, carnivores.weight).tolist()
+    assert float(carnivores.weight[0]) > 20.0
+    assert list(carnivores.fitness) == expected
+
+
+def test_prey_without_probabilistic_band(mocker):
+    """Test that with DeltaPhiMax = 0 a carnivore kills every weaker herbivore it tries."""
+    species = Lowland().carnivore_population.species
+    delta_phi_max = species.parameters_animal["DeltaPhiMax"]
+    species.set_parameters_animals({"DeltaPhiMax": 0})
+    try:
+        land = hunting_cell(fixed_uniform_rng(mocker, 0.99), 0.5, [0.3, 0.4, 1.0])
+        land.herbivore_population.weight = 1.0
+        land.herbivore_population.fitness = [0.3, 0.4, 1.0]
+
+        land.prey()
+    finally:
+        species.set_parameters_animals({"DeltaPhiMax": delta_phi_max})
 
-    assert population_list_before != population_list_after
+    assert list(land.herbivore_population.fitness) == [1.0]
+
+
+def test_prey_kill_probability():
+    """
+    Test that a herbivore in the probabilistic band is killed with probability
+    (fitness of carnivore - fitness of herbivore) / DeltaPhiMax.
+    """
+    delta_phi_max = Lowland().carnivore_population.species.compiled_parameters().DeltaPhiMax
+    rng = np.random.default_rng(2021)
+    trials = 4000
+    kills = 0
+    for _ in range(trials):
+        land = hunting_cell(rng, 0.5, [0.5 - 0.25 * delta_phi_max])
+        land.prey()
+        kills += 1 - len(land.herbivore_population)
+
+    assert abs(kills / trials - 0.25) < 0.03
 
 
 def test_newborn_herbivore_false(mocker):
@@ -284,10 +489,8 @@ def test_newborn_herbivore_false(mocker):
     This test is to see if there will be a newborn if there is only one
     herbivore on the island, which should be false
     """
-    mocker.patch("random.random", return_value=0)
-
     population = [{'species': 'Herbivore', 'age': 10, 'weight': 12.5}]
-    land = Lowland()
+    land = Lowland(rng=fixed_uniform_rng(mocker, 0))
 
     land.population_update(population)
 
@@ -298,12 +501,10 @@ def test_newborn_herbivore_false(mocker):
 
 def test_newborn_herbivore(mocker):
     """Newborn test to see if the herbivore gives birth with three animals placed"""
-    mocker.patch("random.random", return_value=0)
-
     population = [{'species': 'Herbivore', 'age': 18, 'weight': 40},
                   {'species': 'Herbivore', 'age': 9, 'weight': 40},
                   {'species': 'Herbivore', 'age': 5, 'weight': 40}]
-    land = Lowland()
+    land = Lowland(rng=fixed_uniform_rng(mocker, 0))
 
     land.population_update(population)
     population_before_herb = len(land.herbivores)
@@ -317,10 +518,8 @@ def test_newborn_carnivore_false(mocker):
     This test is to see if there will be a newborn if there is only one
     carnivore on the island, which should be false
     """
-    mocker.patch("random.random", return_value=0)
-
     population = [{'species': 'Carnivore', 'age': 10, 'weight': 12.5}]
-    land = Lowland()
+    land = Lowland(rng=fixed_uniform_rng(mocker, 0))
 
     land.population_update(population)
 
@@ -331,11 +530,9 @@ def test_newborn_carnivore_false(mocker):
 
 def test_newborn_carnivore(mocker):
     """Newborn test to see if the carnivore gives birth with three animals placed"""
-    mocker.patch("random.random", return_value=0)
-
     population_carnivore = [{'species': 'Carnivore', 'age': 18, 'weight': 50},
                             {'species': 'Carnivore', 'age': 9, 'weight': 10.3}]
-    land = Lowland()
+    land = Lowland(rng=fixed_uniform_rng(mocker, 0))
 
     land.population_update(population_carnivore)
     population_before_carnivore = len(land.carnivores)
@@ -344,6 +541,24 @@ def test_newborn_carnivore(mocker):
     assert population_before_carnivore + 1 == len(land.carnivores)
 
 
+def test_newborn_mothers_lose_weight(mocker):
+    """Test that every mother loses xi times the weight of her newborn, and the others nothing."""
+    population = [{'species': 'Herbivore', 'age': 5, 'weight': 40},
+                  {'species': 'Herbivore', 'age': 5, 'weight': 10},
+                  {'species': 'Herbivore', 'age': 5, 'weight': 40}]
+    land = Lowland(rng=fixed_uniform_rng(mocker, 0))
+    land.population_update(population)
+
+    land.newborn_herbivore()
+
+    herbivores = land.herbivore_population
+    xi = herbivores.species.compiled_parameters().xi
+    newborn_weight = herbivores.weight[3:]
+    assert list(herbivores.age) == [5, 5, 5, 0, 0]
+    assert herbivores.weight[1] == 10
+    assert list(herbivores.weight[[0, 2]]) == list(40 - xi * newborn_weight)
+
+
 def test_parameters_landscape():
     """Test to see if the subclass Lowland gives the right amount of fodder,
     which should be "f_max" = 800"""
@@ -381,10 +596,9 @@ def test_migration(mocker):
                             {'species': 'Herbivore', 'age': 20, 'weight': 33.3},
                             {'species': 'Herbivore', 'age': 15, 'weight': 35.3},
                             {'species': 'Herbivore', 'age': 9, 'weight': 10.3}]
-    land = Lowland()
+    land = Lowland(rng=fixed_uniform_rng(mocker, 0))
     migrating_land = Highland()
-    mocker.patch("random.choice", return_value=migrating_land)
-    mocker.patch("random.random", return_value=-1)
+    land.neighbors = [migrating_land]
 
     land.population_update(population_herbivore)
 
@@ -395,5 +609,73 @@ def test_migration(mocker):
     assert  animals_before > len(land.herbivores)
 
 
+def queued_uniform_rng(mocker, *draws):
+    """
+    Random number generator where the calls of random give the given arrays in turn, while
+    the other distributions are drawn from a seeded generator.
+    """
+    rng = mocker.Mock(wraps=np.random.default_rng(12345))
+    draws = iter(draws)
+    rng.random.side_effect = lambda size=None: (float(next(draws)[0]) if size is None
+                                                else np.asarray(next(draws), dtype=float))
+    return rng
+
+
+@pytest.mark.parametrize("count", [10, 40])
+def test_migration_to_land_only(mocker, count):
+    """
+    Test that every animal moves to the land neighbor it picks, with its age and weight, and
+    that the animals that pick water, a water neighbor or one past the land neighbors, stay.
+    The animals wait in the arrival buffers until they are merged.
+    """
+    neighbor_count = 5
+    slots = [age % neighbor_count for age in range(count)]
+    choices = [(slot + 0.5) / neighbor_count for slot in slots]
+    population = [{'species': 'Herbivore', 'age': age, 'weight': 20} for age in range(count)]
+    land = Lowland(rng=queued_uniform_rng(mocker, np.zeros(count), choices))
+    land.neighbors = [Highland(), Water(), Lowland()]
+    land.neighbor_count = neighbor_count
+    land.population_update(population)
+    move = mocker.spy(land, "_move")
+
+    land.migrated_animals()
+
+    assert move.call_args.args[3] == slots
+    arrived = [cell.herbivore_population for cell in land.neighbors]
+    assert len(arrived[0]) == 0 and len(arrived[2]) == 0
+
+    for cell in land.neighbors:
+        cell.merge_arrivals()
+
+    assert list(arrived[0].age) == [age for age in range(count) if slots[age] == 0]
+    assert len(arrived[1]) == 0
+    assert list(arrived[2].age) == [age for age in range(count) if slots[age] == 2]
+    assert list(land.herbivore_population.age) == [age for age in range(count)
+                                                   if slots[age] in (1, 3, 4)]
+
+
+def test_migration_choices_in_range(mocker):
+    """
+    Test that the neighbor a migrant picks is never negative nor past the neighbors, and that
+    a negative choice would not move the animal.
+    """
+    land = Lowland(rng=np.random.default_rng(3))
+    land.neighbors = [Highland(), Lowland()]
+    land.neighbor_count = 4
+    land.population_update([{'species': 'Herbivore', 'age': 1, 'weight': 50}
+                            for _ in range(2000)])
+    population = land.herbivore_population
+    move = mocker.patch.object(land, "_move")
+
+    land.migrated_animals()
+
+    choices = move.call_args.args[3]
+    assert choices and min(choices) >= 0 and max(choices) < land.neighbor_count
+
+    mocker.stopall()
+    land._move("herbivore_population", population, [0, 1], [-1, -2])
+    assert len(population) == 2000
+
+
 def test_carnivore_prey(mocker):
     mocker.patch("random.random", return_value = 0)
\ No newline at end of file
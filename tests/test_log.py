@@ -0,0 +1,115 @@
+# -*- encoding: utf-8 -*-
+"""
+This is the test function for the yearly log of the simulation.
+"""
+
+__author__ = "Sathuriyan Sivathas & Lavanyan Rathy"
+__email__ = "sathuriyan.sivathas@nmbu.no & lavanyan.rathy@nmbu.no"
+
+import numpy as np
+import pytest
+
+from src.biosim.island import Island
+from src.biosim.log import YearLog, read_log
+from src.biosim.simulation import BioSim
+
+island_map = "WWWW\nWLHW\nWDLW\nWWWW"
+ini_pop = [{"loc": (2, 2), "pop": [{"species": "Herbivore", "age": 5, "weight": 20}
+                                   for _ in range(20)]},
+           {"loc": (3, 2), "pop": [{"species": "Carnivore", "age": 5, "weight": 20}
+                                   for _ in range(4)]}]
+
+
+@pytest.mark.parametrize("file_format", ["csv", "binary"])
+def test_log_matches_counts(tmp_path, file_format):
+    """Test that the log has one record per year with the counts at the end of the year."""
+    log_file = str(tmp_path / "biosim.log")
+    sim = BioSim(island_map, ini_pop, seed=3, vis_years=0, log_file=log_file,
+                 log_format=file_format, log_flush_years=4)
+    counts = []
+    for _ in range(10):
+        sim.simulate(1)
+        counts.append(sim.num_animals_per_species)
+
+    records = read_log(log_file)
+    assert list(records["year"]) == list(range(1, 11))
+    assert list(records["herbivores"]) == [count["Herbivore"] for count in counts]
+    assert list(records["carnivores"]) == [count["Carnivore"] for count in counts]
+
+
+def test_log_is_buffered(tmp_path):
+    """Test that records are only written when the buffer is full or flushed."""
+    log_file = str(tmp_path / "biosim.log")
+    log = YearLog(log_file, flush_years=3)
+    island = Island(island_map, seed=1)
+
+    log.record(1, island)
+    log.record(2, island)
+    assert len(read_log(log_file)) == 0
+    log.record(3, island)
+    assert len(read_log(log_file)) == 3 and len(log) == 0
+    log.record(4, island)
+    log.flush()
+    assert list(read_log(log_file)["year"]) == [1, 2, 3, 4]
+
+
+@pytest.mark.parametrize("file_format", ["csv", "binary"])
+def test_log_details(tmp_path, file_format):
+    """Test that the detailed records have the counts per landscape type and the means."""
+    log_file = str(tmp_path / "biosim.log")
+    log = YearLog(log_file, file_format, details=True)
+    island = Island(island_map, seed=1)
+    island.population_cell(ini_pop)
+    log.record(0, island)
+    log.flush()
+
+    record = read_log(log_file)[0]
+    herbivores = island.herbivore_snapshot()
+    assert record["herbivores_lowland"] == 20
+    assert record["herbivores_highland"] == record["herbivores_desert"] == 0
+    assert record["carnivores_desert"] == 4
+    assert record["herbivores_mean_weight"] == pytest.approx(herbivores.weight.mean())
+    assert record["herbivores_mean_fitness"] == pytest.approx(herbivores.fitness.mean())
+    assert record["carnivores_mean_age"] == 5
+
+
+def test_log_details_without_animals(tmp_path):
+    """Test that the means of a species without animals are not a number."""
+    log_file = str(tmp_path / "biosim.log")
+    log = YearLog(log_file, details=True)
+    log.record(0, Island(island_map, seed=1))
+    log.flush()
+
+    assert np.isnan(read_log(log_file)[0]["carnivores_mean_fitness"])
+
+
+@pytest.mark.parametrize("file_format", ["csv", "binary"])
+def test_log_append(tmp_path, file_format):
+    """Test that a log can be appended to, but only with records of the same fields."""
+    log_file = str(tmp_path / "biosim.log")
+    island = Island(island_map, seed=1)
+    log = YearLog(log_file, file_format)
+    log.record(1, island)
+    log.flush()
+
+    log = YearLog(log_file, file_format, append=True)
+    log.record(2, island)
+    log.flush()
+    assert list(read_log(log_file)["year"]) == [1, 2]
+    with pytest.raises(ValueError):
+        YearLog(log_file, file_format, details=True, append=True)
+
+
+def test_log_format_unknown(tmp_path):
+    """Test that an unknown log format is rejected."""
+    with pytest.raises(ValueError):
+        YearLog(str(tmp_path / "biosim.log"), file_format="json")
+
+
+def test_no_print_unless_verbose(capsys):
+    """Test that the counts are only printed to stdout when asked for."""
+    BioSim(island_map, ini_pop, seed=3, vis_years=0).simulate(2)
+    assert capsys.readouterr().out == ""
+
+    BioSim(island_map, ini_pop, seed=3, vis_years=0, verbose=True).simulate(2)
+    assert len(capsys.readouterr().out.splitlines()) == 2
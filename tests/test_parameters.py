@@ -0,0 +1,64 @@
+# -*- encoding: utf-8 -*-
+"""
+This is the test function for the compiled parameter snapshots of the species and landscape types.
+"""
+
+__author__ = "Sathuriyan Sivathas & Lavanyan Rathy"
+__email__ = "sathuriyan.sivathas@nmbu.no & lavanyan.rathy@nmbu.no"
+
+import pytest
+
+from src.biosim.animals import Carnivore
+from src.biosim.landscape import Highland
+from src.biosim.parameters import ParameterDict, SpeciesParameters
+
+
+def test_parameter_dict_counts_changes():
+    """Test that the version goes up every time the dictionary is changed."""
+    parameters = ParameterDict({"f_max": 300})
+    parameters["f_max"] = 200
+    parameters.update({"f_max": 100})
+
+    assert parameters.version == 2
+    assert parameters["f_max"] == 100
+
+
+def test_snapshot_is_read_only():
+    """Test that a compiled snapshot can not be changed."""
+    compiled = Carnivore.compiled_parameters()
+    with pytest.raises(AttributeError):
+        compiled.F = 1000
+
+
+def test_snapshot_follows_set_parameters():
+    """Test that setting parameters makes a new snapshot with a new version."""
+    before = Carnivore.compiled_parameters()
+
+    Carnivore.set_parameters_animals({"F": 40.0})
+    try:
+        after = Carnivore.compiled_parameters()
+        assert after.F == 40.0
+        assert after.version > before.version
+        assert after.age_table is before.age_table
+    finally:
+        Carnivore.set_parameters_animals({"F": before.F})
+
+
+def test_snapshot_follows_dictionary_changes():
+    """Test that changing the dictionary directly also gives a new snapshot."""
+    before = Highland.compiled_parameters()
+
+    Highland.parameters_fodder["f_max"] = 123
+    try:
+        assert Highland.compiled_parameters().f_max == 123
+        assert Highland().fodder == 123
+    finally:
+        Highland.set_parameters_fodder({"f_max": before.f_max})
+
+
+def test_birth_weight_limit():
+    """Test that the derived birth weight limit is calculated from the parameters."""
+    compiled = SpeciesParameters(ParameterDict(Carnivore.parameters_animal))
+
+    assert compiled.birth_weight_limit == compiled.zeta * (compiled.w_birth
+                                                           + compiled.sigma_birth)
@@ -0,0 +1,137 @@
+# -*- encoding: utf-8 -*-
+"""
+This is the test function for the Population class, which stores the animals of one species in
+one cell as arrays.
+"""
+
+__author__ = "Sathuriyan Sivathas & Lavanyan Rathy"
+__email__ = "sathuriyan.sivathas@nmbu.no & lavanyan.rathy@nmbu.no"
+
+import numpy as np
+import pytest
+
+from src.biosim.animals import Herbivore
+from src.biosim.population import Population, PopulationCounter
+
+
+@pytest.fixture
+def population():
+    """Population with three herbivores."""
+    herbivores = Population(Herbivore)
+    herbivores.extend([10, 9, 5], [12.5, 10.3, 8.1])
+    return herbivores
+
+
+def test_extend(population):
+    """Test if the animals are added with their age, weight and fitness."""
+    assert len(population) == 3
+    assert list(population.age) == [10, 9, 5]
+    assert list(population.weight) == [12.5, 10.3, 8.1]
+    assert population.fitness[0] == Herbivore(10, 12.5).fitness
+
+
+def test_extend_non_integer_age():
+    """Test that ages that are not integers are rejected."""
+    with pytest.raises(ValueError):
+        Population(Herbivore).extend([2.5], [10])
+
+
+def test_append_animal():
+    """Test if an animal object gets copied into the arrays."""
+    herbivores = Population(Herbivore)
+    herbivore = Herbivore(3, 20)
+    herbivores.append(herbivore)
+
+    assert len(herbivores) == 1
+    assert herbivores.weight[0] == herbivore.weight
+    assert herbivores.fitness[0] == herbivore.fitness
+
+
+@pytest.mark.parametrize("age", [2.5, -1])
+def test_append_invalid_age(age):
+    """Test that an animal whose age is not a non-negative integer is not appended."""
+    herbivores = Population(Herbivore)
+    with pytest.raises(ValueError):
+        herbivores.append(Herbivore(age, 20))
+
+    assert len(herbivores) == 0
+
+
+def test_view_writes_to_arrays(population):
+    """Test that changing a view changes the arrays of the population."""
+    view = population[1]
+    view.weight_increase(10)
+
+    assert isinstance(view, Herbivore)
+    assert population.weight[1] == 10.3 + 0.9 * 10
+    assert population.fitness[1] == Herbivore(9, 10.3 + 0.9 * 10).fitness
+
+
+def test_view_index_out_of_range(population):
+    """Test that indexing outside the population raises an error."""
+    assert population[-1].age == 5
+    with pytest.raises(IndexError):
+        population[3]
+
+
+def test_compact(population):
+    """Test if only the animals in the mask are kept, in the same order."""
+    population.compact(np.array([True, False, True]))
+
+    assert len(population) == 2
+    assert list(population.age) == [10, 5]
+
+
+def test_compact_reuses_room(population):
+    """Test that the freed room is reused when new animals are added."""
+    capacity = population._age.shape[0]
+    population.compact(np.array([False, False, False]))
+    population.extend([1, 2, 3], [5.0, 6.0, 7.0])
+
+    assert population._age.shape[0] == capacity
+    assert list(population.age) == [1, 2, 3]
+
+
+def test_compact_keep_all(population):
+    """Test that nothing changes when every animal is kept."""
+    population.compact(np.array([True, True, True]))
+
+    assert list(population.age) == [10, 9, 5]
+    assert list(population.weight) == [12.5, 10.3, 8.1]
+
+
+def test_mask(population):
+    """Test that masking gives a new population with copies of the selected animals."""
+    selected = population.mask(np.array([False, True, True]))
+
+    assert len(selected) == 2
+    assert len(population) == 3
+    assert list(selected.age) == [9, 5]
+
+
+def test_extend_from(population):
+    """Test that animals can be copied from one population to another."""
+    other = Population(Herbivore)
+    other.extend_from(population, [2, 0])
+
+    assert list(other.age) == [5, 10]
+    assert list(other.weight) == [8.1, 12.5]
+
+
+def test_reorder(population):
+    """Test that the animals can be rearranged."""
+    population.reorder([2, 0, 1])
+
+    assert list(population.age) == [5, 10, 9]
+    assert list(population.weight) == [8.1, 12.5, 10.3]
+
+
+def test_counter(population):
+    """Test that a bound counter follows every change of the size of the population."""
+    counter = PopulationCounter((2, 2))
+    population.bind_counter(counter, 3)
+    population.extend([1], [2.0])
+    population.compact(np.array([True, False, True, False]))
+
+    assert counter.total == 2
+    assert counter.cells.tolist() == [[0, 0], [0, 2]]
@@ -0,0 +1,115 @@
+# -*- encoding: utf-8 -*-
+"""
+This is the test function for the parameter sweeps and their cache.
+"""
+
+__author__ = "Sathuriyan Sivathas & Lavanyan Rathy"
+__email__ = "sathuriyan.sivathas@nmbu.no & lavanyan.rathy@nmbu.no"
+
+import os
+
+from src.biosim import sweep as sweep_module
+from src.biosim.ensemble import run_ensemble
+from src.biosim.sweep import ParameterSweep, parameter_grid
+
+island_map = "WWWWW\nWLLHW\nWDLLW\nWWWWW"
+ini_pop = [{"loc": (2, 2), "pop": [{"species": "Herbivore", "age": 5, "weight": 20}
+                                   for _ in range(30)]},
+           {"loc": (3, 3), "pop": [{"species": "Carnivore", "age": 5, "weight": 20}
+                                   for _ in range(5)]}]
+
+
+def test_parameter_grid():
+    """Test that the grid has every combination of the values."""
+    points = parameter_grid({("Carnivore", "F"): [10, 50], ("L", "f_max"): [400, 600, 800]})
+
+    assert len(points) == 6
+    assert {("Carnivore", "F"): 50, ("L", "f_max"): 600} in points
+
+
+def test_split_point():
+    """Test that the parameters of a point are sorted into species and landscapes."""
+    species, landscapes = ParameterSweep.split_point({("Carnivore", "F"): 10,
+                                                      ("Carnivore", "DeltaPhiMax"): 5,
+                                                      ("L", "f_max"): 400})
+
+    assert species == {"Carnivore": {"F": 10, "DeltaPhiMax": 5}}
+    assert landscapes == {"L": {"f_max": 400}}
+
+
+def test_sweep_matches_ensemble(tmp_path):
+    """Test that every point gives the counts of an ensemble with its parameters."""
+    sweep = ParameterSweep(island_map, ini_pop, 4, str(tmp_path), processes=2)
+    points = parameter_grid({("Carnivore", "F"): [10, 50]})
+    counts = sweep.run(points, seeds=[1, 2])
+
+    assert counts.shape == (2, 2, 5, 2)
+    expected = run_ensemble(island_map, ini_pop, [1, 2], 4, processes=1,
+                            species_parameters={"Carnivore": {"F": 10}})
+    assert (counts[0] == expected).all()
+
+
+def test_sweep_uses_cache(tmp_path):
+    """Test that points already simulated are read from the cache."""
+    sweep = ParameterSweep(island_map, ini_pop, 3, str(tmp_path), processes=1)
+    first = sweep.run(parameter_grid({("L", "f_max"): [400, 800]}), seeds=[1])
+    assert sweep.simulated == 2
+    assert len(os.listdir(tmp_path)) == 2
+
+    second = sweep.run(parameter_grid({("L", "f_max"): [800, 400, 600]}), seeds=[1])
+    assert sweep.simulated == 1
+    assert (second[0] == first[1]).all() and (second[1] == first[0]).all()
+
+
+def test_sweep_runs_duplicates_once(tmp_path):
+    """Test that a point that occurs twice is only simulated once."""
+    sweep = ParameterSweep(island_map, ini_pop, 3, str(tmp_path), processes=1)
+    counts = sweep.run([{("L", "f_max"): 500}, {("L", "f_max"): 500}], seeds=[1])
+
+    assert sweep.simulated == 1
+    assert (counts[0] == counts[1]).all()
+
+
+def test_cache_key_depends_on_scenario(tmp_path):
+    """Test that another seed, number of years or population gives another key."""
+    sweep = ParameterSweep(island_map, ini_pop, 3, str(tmp_path))
+    parameters = {"species": {}, "landscapes": {}}
+    key = sweep.cache_key(parameters, 1)
+
+    assert key == sweep.cache_key(parameters, 1)
+    assert key != sweep.cache_key(parameters, 2)
+    assert key != ParameterSweep(island_map, ini_pop, 4, str(tmp_path)).cache_key(parameters, 1)
+    assert key != ParameterSweep(island_map, ini_pop[:1], 3,
+                                 str(tmp_path)).cache_key(parameters, 1)
+
+
+def test_cache_key_depends_on_results_version(tmp_path, monkeypatch):
+    """Test that a new version of the results gives another key."""
+    sweep = ParameterSweep(island_map, ini_pop, 3, str(tmp_path))
+    parameters = {"species": {}, "landscapes": {}}
+    key = sweep.cache_key(parameters, 1)
+
+    monkeypatch.setattr(ParameterSweep, "results_version", ParameterSweep.results_version + 1)
+    assert key != sweep.cache_key(parameters, 1)
+
+
+def test_sweep_restores_parameters_before_reset(tmp_path, monkeypatch):
+    """
+    Test that a sweep in this process sets the parameters back as soon as its points are done,
+    before the scenario of the points is dropped.
+    """
+    restore_parameters = sweep_module.BioSim.restore_parameters
+    calls = []
+
+    def record_restore(cls, parameters):
+        calls.append((parameters, sweep_module._scenario))
+        restore_parameters(parameters)
+
+    monkeypatch.setattr(sweep_module.BioSim, "restore_parameters", classmethod(record_restore))
+    before = sweep_module.BioSim.parameter_state()
+    sweep = ParameterSweep(island_map, ini_pop, 2, str(tmp_path), processes=1)
+    sweep.run(parameter_grid({("L", "f_max"): [400, 500]}), seeds=[1])
+
+    assert calls[-1][0] == before and calls[-1][1] is not None
+    assert sweep_module._scenario is None
+    assert sweep_module.BioSim.parameter_state() == before
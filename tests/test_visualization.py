@@ -0,0 +1,92 @@
+# -*- encoding: utf-8 -*-
+"""
+This is the test function for the histograms of the visualization.
+"""
+
+__author__ = "Sathuriyan Sivathas & Lavanyan Rathy"
+__email__ = "sathuriyan.sivathas@nmbu.no & lavanyan.rathy@nmbu.no"
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+
+from src.biosim.island import Island
+from src.biosim.simulation import BioSim
+from src.biosim.visualization import Visualization
+
+island_map = "WWWW\nWLHW\nWWWW"
+
+
+@pytest.fixture
+def visualization(tmp_path):
+    """Visualization of an island with some herbivores, set up for ten years."""
+    vis = Visualization(hist_specs={"weight": {"max": 40, "delta": 5}}, img_dir=str(tmp_path),
+                        img_name="vis")
+    vis.setup(10, 1, island_map)
+    yield vis
+    plt.close("all")
+
+
+@pytest.fixture
+def island():
+    """Island with ten herbivores of different weights."""
+    island = Island(island_map, seed=1)
+    island.population_cell([{"loc": (2, 2), "pop": [
+        {"species": "Herbivore", "age": age, "weight": 4.0 * age + 1} for age in range(10)]}])
+    return island
+
+
+def update(vis, island, step=0):
+    """Update the visualization with the island."""
+    vis.update(step, {"Herbivore": 10, "Carnivore": 0}, island.matrix_herbivores(),
+               island.matrix_carnivores(), island.herbivore_snapshot(),
+               island.carnivore_snapshot())
+
+
+def test_histogram_heights(visualization, island):
+    """Test that the steps have the counts of the animals in the fixed bins."""
+    update(visualization, island)
+    herbivores, carnivores = visualization._hist_steps["weight"]
+    edges = np.linspace(0, 40, 9)
+
+    assert (herbivores.get_data().edges == edges).all()
+    assert (herbivores.get_data().values == np.histogram(
+        island.herbivore_snapshot().weight, bins=edges)[0]).all()
+    assert (carnivores.get_data().values == 0).all()
+
+
+def test_histograms_are_kept(visualization, island):
+    """Test that the updates change the artists of the histograms instead of making new ones."""
+    update(visualization, island, 0)
+    artists = {prop: list(ax.get_children()) for prop, ax in
+               (("weight", visualization._count_weight_ax),
+                ("age", visualization._count_age_ax))}
+    update(visualization, island, 1)
+
+    assert list(visualization._count_weight_ax.get_children()) == artists["weight"]
+    assert list(visualization._count_age_ax.get_children()) == artists["age"]
+
+
+def test_histogram_axis_grows(visualization, island):
+    """Test that the y-axis grows when a bin does not fit."""
+    assert visualization._count_weight_ax.get_ylim()[1] == 1
+    update(visualization, island)
+    highest = visualization._hist_steps["weight"][0].get_data().values.max()
+
+    assert highest > 1
+    assert visualization._count_weight_ax.get_ylim()[1] >= highest
+
+
+def test_count_lines_every_year():
+    """Test that the count lines have the counts of every year, also between the updates."""
+    sim = BioSim(island_map, [{"loc": (2, 2), "pop": [
+        {"species": "Herbivore", "age": 5, "weight": 20} for _ in range(10)]}], seed=1,
+                 vis_years=2)
+    try:
+        sim.simulate(6)
+        herbivores = sim.visualization._herb_line.get_ydata()[:6]
+        carnivores = sim.visualization._carn_line.get_ydata()[:6]
+    finally:
+        plt.close("all")
+
+    assert np.isfinite(herbivores).all() and np.isfinite(carnivores).all()